@@ -2,7 +2,9 @@ import cv2
 import numpy as np
 import time
 import os
+import argparse
 from deepface import DeepFace
+from emotion_backends import DeepFaceBackend
 
 # Optional: Try to use virtual webcam
 USE_VIRTUAL_CAM = True
@@ -58,7 +60,47 @@ def draw_emotion_bars(frame, emotions, top_left=(10, 10), bar_width=150, bar_hei
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
 
 
+def benchmark(cap, backend, frames=50):
+    """Time the old full-frame DeepFace.analyze call against the prebuilt crop-only backend."""
+    samples = []
+    while len(samples) < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        samples.append(cv2.flip(frame, 1))
+    if not samples:
+        print("No frames to benchmark")
+        return
+
+    def timed(fn):
+        fn(samples[0])  # warm-up
+        times, faces = [], 0
+        for frame in samples:
+            start = time.perf_counter()
+            result = fn(frame)
+            times.append((time.perf_counter() - start) * 1000)
+            faces += len(result)
+        return np.mean(times), np.percentile(times, 95), faces / len(samples)
+
+    before = timed(lambda f: DeepFace.analyze(f, actions=["emotion"], enforce_detection=False))
+    after = timed(backend.detect_emotions)
+    print(f"{'path':<34} {'mean ms':>8} {'p95 ms':>8} {'faces/frame':>12}")
+    for name, (mean, p95, faces) in (("DeepFace.analyze (full frame)", before),
+                                      (f"prebuilt model + {backend.detector_backend} crops", after)):
+        print(f"{name:<34} {mean:>8.1f} {p95:>8.1f} {faces:>12.2f}")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="DeepFace emotion webcam / virtual camera")
+    parser.add_argument("--detector-backend", default="opencv",
+                        help="DeepFace face detector: opencv (fastest), ssd, yunet, mediapipe, mtcnn, retinaface")
+    parser.add_argument("--bench", type=int, default=0, metavar="FRAMES",
+                        help="Compare old and new inference timings on this many frames and exit")
+    args = parser.parse_args()
+
+    # Build the emotion model and detector once instead of on every analyze() call
+    backend = DeepFaceBackend(detector_backend=args.detector_backend)
+
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         raise RuntimeError("Webcam not accessible")
@@ -77,6 +119,11 @@ def main():
         "surprise": "emojis/surprised.png",
     }
 
+    if args.bench:
+        benchmark(cap, backend, args.bench)
+        cap.release()
+        return
+
     print("Starting webcam stream...")
 
     def run_loop(cam=None):
@@ -84,6 +131,7 @@ def main():
         result_text = "Analyzing..."
         emoji_path = None
         emotion_scores = {}
+        faces = []
         prev_time = time.time()
 
         while True:
@@ -102,19 +150,15 @@ def main():
             # Emotion detection every .1s
             if current_time - last_inference_time > 0.2:
                 try:
-                    result = DeepFace.analyze(frame, actions=["emotion"], enforce_detection=False)
+                    faces = backend.detect_emotions(frame)
 
-                    if isinstance(result, list) and len(result) > 0:
-                        dominant_emotion = result[0]["dominant_emotion"]
-                        emotion_scores = result[0]["emotion"]
+                    if faces:
+                        # Bars and emoji follow the largest face; every face gets a box
+                        main_face = max(faces, key=lambda face: face["box"][2] * face["box"][3])
+                        emotion_scores = {k: v * 100 for k, v in main_face["emotions"].items()}
+                        dominant_emotion = max(emotion_scores, key=emotion_scores.get)
                         result_text = f"{dominant_emotion.capitalize()} ({emotion_scores[dominant_emotion]:.1f}%)"
                         emoji_path = emotion_to_emoji_path.get(dominant_emotion)
-
-                        # Draw bounding box
-                        region = result[0].get("region", {})
-                        if region:
-                            x, y, w, h = region.get("x", 0), region.get("y", 0), region.get("w", 0), region.get("h", 0)
-                            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 255), 2)
                     else:
                         result_text = "No face detected"
                         emoji_path = None
@@ -124,10 +168,18 @@ def main():
                     result_text = "Error"
                     emoji_path = None
                     emotion_scores = {}
+                    faces = []
                 last_inference_time = current_time
 
             annotated = frame.copy()
 
+            # Draw bounding boxes for all faces
+            for face in faces:
+                x, y, w, h = face["box"]
+                label = max(face["emotions"], key=face["emotions"].get)
+                cv2.rectangle(annotated, (x, y), (x + w, y + h), (0, 255, 255), 2)
+                cv2.putText(annotated, label, (x, y - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
             # Draw emoji and emotion label
             (text_width, text_height), baseline = cv2.getTextSize(result_text, cv2.FONT_HERSHEY_SIMPLEX, 1, 2)
             text_x = (width - text_width) // 2
@@ -0,0 +1,185 @@
+"""analyze_video.py
+--------------------------------
+Offline emotion timeline for a recorded video.  The video is split into
+frame ranges that are decoded and analysed across a process pool (one
+warm detector per worker), and the per-face results are merged back in
+order into the same ``raw_emotion_log_*.csv`` format that the live
+``EmotionCSVLogger`` writes: rows stamped with ``capture_ns`` (video time
+in nanoseconds) and a ``session.json`` clock anchor mapping video time 0
+to the wall-clock start of the recording.
+
+```bash
+python analyze_video.py meeting.mp4 --backend fer --workers 8
+python analyze_video.py meeting.mp4 --interval 0.5 --start-time "2025-06-22 14:00:00"
+```
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import time
+from datetime import datetime, timedelta
+
+import cv2
+from tqdm import tqdm
+
+from emotion_backends import BACKENDS
+from face_results import FaceResults
+from log_retention import SESSION_META, write_clock_anchor
+
+_detector = None
+
+
+def _init_worker(backend):
+    # One inference thread per process; parallelism comes from the pool.
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    os.environ.setdefault("TF_NUM_INTRAOP_THREADS", "1")
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+    cv2.setNumThreads(1)
+
+    global _detector
+    from emotion_backends import load_backend
+    _detector = load_backend(backend)
+
+
+def analyze_segment(task):
+    """Analyse every `step`-th frame in [start, end) and return (frame_idx, face_idx, dominant_emotion) rows."""
+    path, start, end, step = task
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    rows = []
+    # First sampled frame is the first multiple of step at or after start
+    next_sample = -(-start // step) * step
+    for frame_idx in range(start, end):
+        if frame_idx != next_sample:
+            if not cap.grab():
+                break
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        next_sample += step
+        try:
+            results = FaceResults.from_fer(_detector.detect_emotions(frame))
+        except Exception as e:
+            print(f"[ANALYZE] Frame {frame_idx}: {e}")
+            continue
+        for face_idx, label in enumerate(results.top_labels()):
+            rows.append((frame_idx, face_idx, label))
+
+    cap.release()
+    return rows
+
+
+def new_session_dir(stamp, logs_dir="logs"):
+    """Create logs_dir/session_<stamp>, suffixed _2, _3, ... if taken; returns (directory, stamp).
+
+    Never reuses a directory: a live or earlier analysed session with the
+    same start second keeps its logs.
+    """
+    os.makedirs(logs_dir, exist_ok=True)
+    base, attempt = stamp, 1
+    while True:
+        session_dir = os.path.join(logs_dir, f"session_{stamp}")
+        try:
+            os.mkdir(session_dir)
+            return session_dir, stamp
+        except FileExistsError:
+            attempt += 1
+            stamp = f"{base}_{attempt}"
+
+
+def split_segments(frame_count, segments):
+    size = -(-frame_count // segments)
+    return [(start, min(start + size, frame_count)) for start in range(0, frame_count, size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel offline emotion analysis of a video file")
+    parser.add_argument("video", help="Video file to analyse")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="fer")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--interval", type=float, default=0.2,
+                        help="Seconds of video between analysed frames (matches emotion_polling_rate)")
+    parser.add_argument("--segments-per-worker", type=int, default=4,
+                        help="More segments balance load better at a small seek cost")
+    parser.add_argument("--start-time", type=str,
+                        help="Wall-clock time of the first frame (YYYY-MM-DD HH:MM:SS); "
+                             "defaults to file modification time minus duration")
+    parser.add_argument("--output", type=str, help="CSV path (default: new logs/session_* directory)")
+    parser.add_argument("--no-process", action="store_true",
+                        help="Skip smoothing and charts after writing the raw timeline")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    if not cap.isOpened():
+        print(f"[ERROR] Cannot open video file: {args.video}")
+        return
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if frame_count <= 0:
+        print(f"[ERROR] Could not determine frame count of {args.video}")
+        return
+
+    duration = frame_count / fps
+    if args.start_time:
+        start_time = datetime.strptime(args.start_time, "%Y-%m-%d %H:%M:%S")
+    else:
+        start_time = datetime.fromtimestamp(os.path.getmtime(args.video)) - timedelta(seconds=duration)
+
+    step = max(1, round(args.interval * fps))
+    workers = max(1, args.workers)
+    segments = split_segments(frame_count, workers * max(1, args.segments_per_worker))
+    tasks = [(args.video, start, end, step) for start, end in segments]
+    print(f"[ANALYZE] {frame_count} frames ({duration:.0f}s @ {fps:g} fps), every {step} frame(s), "
+          f"{len(tasks)} segments on {workers} worker(s)")
+
+    if args.output:
+        output_csv = args.output
+        processed_csv = os.path.splitext(output_csv)[0] + "_processed.csv"
+    else:
+        session_dir, stamp = new_session_dir(start_time.strftime("%Y-%m-%d_%H-%M-%S"))
+        output_csv = os.path.join(session_dir, f"raw_emotion_log_{stamp}.csv")
+        processed_csv = os.path.join(session_dir, f"processed_emotion_log_{stamp}.csv")
+    log_dir = os.path.dirname(output_csv) or "."
+    if args.output:
+        os.makedirs(log_dir, exist_ok=True)
+        if os.path.exists(os.path.join(log_dir, SESSION_META)):
+            print(f"[ERROR] {log_dir} already holds another session's {SESSION_META}; "
+                  f"choose an empty directory for --output")
+            return
+    # Video time 0 is the first frame; rows carry nanoseconds from there
+    anchor_ns = write_clock_anchor(log_dir, wall_clock=start_time, monotonic_ns=0)["monotonic_ns"]
+
+    started = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+    analysed = 0
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(args.backend,)) as pool, \
+            open(output_csv, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["capture_ns", "person_id", "dominant_emotion"])
+        # imap yields segment results in submission order, so rows come out sorted
+        for rows in tqdm(pool.imap(analyze_segment, tasks), total=len(tasks), unit="segment"):
+            for frame_idx, face_idx, label in rows:
+                writer.writerow([anchor_ns + round(frame_idx / fps * 1e9), f"face_{face_idx}", label])
+            analysed += len(rows)
+
+    elapsed = time.perf_counter() - started
+    print(f"[ANALYZE] {analysed} face results in {elapsed:.1f}s "
+          f"({frame_count / elapsed:.0f} video frames/s, {duration / elapsed:.1f}x real time)")
+    print(f"[ANALYZE] Timeline saved to {output_csv}")
+
+    if not args.output:
+        from session_index import SessionIndex
+        SessionIndex().ingest_session(session_dir)
+
+    if not args.no_process:
+        from process_emotion import process_emotion_csv
+        process_emotion_csv(output_csv, processed_csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import shutil
+
+from log_retention import LOGS_DIR, open_segment, strip_log_suffix
+
+CACHE_DIR = os.path.join(LOGS_DIR, ".cache")
+# Bump when the processing or plotting code changes what it produces
+CACHE_VERSION = 2
+# Next to the outputs: which key each output file was last produced under
+MANIFEST = ".artifacts.json"
+# In the cache root: content digest of each input file by path, size and mtime
+DIGESTS = "digests.json"
+
+
+class ArtifactCache:
+    """Content-addressed store for files derived from emotion logs (smoothed CSVs, charts).
+
+    The key covers every input's logical name and decompressed content plus
+    the processing parameters, so an unchanged log processed with unchanged
+    settings is served by copying the stored files instead of recomputing
+    them, even after retention has compressed it.  Content digests are
+    remembered by path, size and modification time, so only new or changed
+    files are read.  The least recently used entries are evicted beyond ``max_mb``.
+    Placed outputs are recorded in a manifest beside them, so is_current()
+    can tell that they are up to date without touching the cache.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_mb=200):
+        self.root = root
+        self.max_mb = max_mb
+
+    def key(self, inputs, **params):
+        digests = self._load_digests()
+        known = dict(digests)
+        # x.csv and x.csv.gz are the same input
+        stamp = [[strip_log_suffix(os.path.basename(path)), self._digest(path, digests)] for path in inputs]
+        if digests != known:
+            self._save_digests(digests)
+        blob = json.dumps({"version": CACHE_VERSION, "inputs": stamp, "params": params}, sort_keys=True)
+        return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _digest(path, digests):
+        info = os.stat(path)
+        stat = [info.st_size, info.st_mtime_ns]
+        name = os.path.abspath(path)
+        if digests.get(name, [None])[:2] == stat:
+            return digests[name][2]
+        sha = hashlib.sha1()
+        with open_segment(path) as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        digests[name] = stat + [sha.hexdigest()]
+        return digests[name][2]
+
+    def _load_digests(self):
+        try:
+            with open(os.path.join(self.root, DIGESTS)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_digests(self, digests):
+        # Forget files that were compressed or deleted since
+        digests = {name: value for name, value in digests.items() if os.path.exists(name)}
+        os.makedirs(self.root, exist_ok=True)
+        partial = os.path.join(self.root, f"{DIGESTS}.{os.getpid()}.part")
+        with open(partial, "w") as f:
+            json.dump(digests, f)
+        os.replace(partial, os.path.join(self.root, DIGESTS))
+
+    def fetch(self, key, outputs):
+        """Copy the stored artifacts to outputs ({name: path}); False if any is missing."""
+        entry = os.path.join(self.root, key)
+        if not all(os.path.exists(os.path.join(entry, name)) for name in outputs):
+            return False
+        try:
+            for name, path in outputs.items():
+                shutil.copyfile(os.path.join(entry, name), path)
+            os.utime(entry)  # Recently used
+        except OSError:
+            # Evicted by another process while copying
+            return False
+        self._mark(key, outputs)
+        return True
+
+    def store(self, key, outputs):
+        entry = os.path.join(self.root, key)
+        partial = f"{entry}.{os.getpid()}.part"
+        os.makedirs(partial, exist_ok=True)
+        for name, path in outputs.items():
+            shutil.copyfile(path, os.path.join(partial, name))
+        try:
+            os.replace(partial, entry)
+        except OSError:
+            # Stored meanwhile by another process
+            shutil.rmtree(partial, ignore_errors=True)
+        self._mark(key, outputs)
+        self.evict()
+
+    @staticmethod
+    def _manifest(outputs):
+        return os.path.join(os.path.dirname(next(iter(outputs.values()))) or ".", MANIFEST)
+
+    def _mark(self, key, outputs):
+        path = self._manifest(outputs)
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.update({os.path.basename(p): key for p in outputs.values()})
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=1)
+
+    def is_current(self, key, outputs):
+        """True if every output exists and was last produced under key."""
+        try:
+            with open(self._manifest(outputs)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return all(os.path.exists(p) and manifest.get(os.path.basename(p)) == key
+                   for p in outputs.values())
+
+    def evict(self):
+        if not self.max_mb or not os.path.isdir(self.root):
+            return
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".part") or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_mb * 1024 * 1024:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
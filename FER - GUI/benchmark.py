@@ -0,0 +1,282 @@
+"""benchmark.py
+--------------------------------
+Offline, webcam-free benchmark of the emotion pipelines.  Drives the same
+stages as ``fer_pipeline.run_fer_loop`` (``--loop gui``) or the
+``obs_virtual_cam`` loop (``--loop obs``) from a video file or from
+generated frames, and reports throughput, per-stage latency percentiles
+and peak RSS per backend as JSON.  Display and virtual-camera sinks are
+replaced by null sinks so it runs on headless CPU-only Linux.  Backends are
+wrapped in ``RegionFaceSearch`` as the pipelines do (``--no-roi-search`` to
+skip), so a run against a local inference service also checks the remote
+path end to end.
+
+```bash
+python benchmark.py --backends stub fer --frames 300 --output bench.json
+python benchmark.py --video meeting.mp4 --loop obs --backends fer
+python benchmark.py --baseline bench.json   # exit 1 on regression
+python inference_service.py --backend stub & python benchmark.py --backends remote
+```
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from csv_logger import EmotionCSVLogger
+from emotion_backends import BACKENDS, load_backend
+from face_results import FaceResults
+from face_search import RegionFaceSearch
+from frame_sources import SyntheticSource, VideoFileSource
+from metrics_utils import StageMetrics
+from preprocessing import PreprocessChain
+from smoothing import EmotionSmoother
+from visual_utils import draw_emotion_data, draw_status_text
+
+EMOJI_PATHS = {
+    "angry": "emojis/angry.png",
+    "disgust": "emojis/disgust.png",
+    "fear": "emojis/fear.png",
+    "happy": "emojis/happy.png",
+    "sad": "emojis/sad.png",
+    "surprise": "emojis/surprised.png",
+    "neutral": "emojis/neutral.png",
+}
+
+
+# ---------------------------------------------------------------------------
+# Pipeline loops (null sinks)
+# ---------------------------------------------------------------------------
+
+def run_gui_loop(detector, source, metrics, detect_every, log_path):
+    smoother = EmotionSmoother()
+    smoothed = FaceResults()
+    csv_logger = EmotionCSVLogger()
+    csv_logger.raw_csv_path = log_path
+    csv_logger.active = True
+    preprocess = PreprocessChain(metrics=metrics)
+
+    frame_count = 0
+    while True:
+        with metrics.time("capture"):
+            ret, frame = source.read()
+        if not ret:
+            break
+
+        frame = cv2.flip(frame, 1)
+
+        if frame_count % detect_every == 0:
+            with metrics.time("preprocess"):
+                frame_copy = preprocess.apply(frame)
+            with metrics.time("detect"):
+                faces = detector.find_faces(frame_copy, bgr=True)
+            with metrics.time("preprocess.roi"):
+                frame_copy = preprocess.apply_rois(frame_copy, faces)
+            with metrics.time("classify"):
+                results = FaceResults.from_fer(detector.detect_emotions(frame_copy, face_rectangles=faces))
+            preprocess.to_source(results)
+            with metrics.time("smooth"):
+                smoothed = smoother.smooth_results(results)
+            if results:
+                with metrics.time("log"):
+                    csv_logger.log("user", results.top_labels()[0], captured_ns=source.captured_ns)
+
+        with metrics.time("overlay"):
+            frame = draw_emotion_data(frame, smoothed, None, EMOJI_PATHS, smooth=False)
+            draw_status_text(frame, 0.0, frame_count)
+
+        frame_count += 1
+        metrics.frame_done()
+
+
+def run_obs_loop(detector, source, metrics, detect_every, log_path):
+    smoother = EmotionSmoother()
+    height = width = None
+    # Frames without inference redraw the last smoothed results, as obs_virtual_cam does
+    results = FaceResults()
+
+    frame_idx = 0
+    while True:
+        with metrics.time("capture"):
+            ok, frame_bgr = source.read()
+        if not ok:
+            break
+        if width is None:
+            height, width = frame_bgr.shape[:2]
+
+        run_inference = frame_idx % detect_every == 0
+        with metrics.time("preprocess"):
+            if frame_bgr.shape[1] != width or frame_bgr.shape[0] != height:
+                frame_bgr = cv2.resize(frame_bgr, (width, height))
+
+        if run_inference:
+            with metrics.time("detect"):
+                faces = detector.find_faces(frame_bgr, bgr=True)
+            with metrics.time("classify"):
+                results = FaceResults.from_fer(detector.detect_emotions(frame_bgr, face_rectangles=faces))
+            with metrics.time("smooth"):
+                results = smoother.smooth_results(results)
+
+        with metrics.time("overlay"):
+            frame_bgr = draw_emotion_data(frame_bgr, results, None, EMOJI_PATHS, smooth=False)
+
+        with metrics.time("output"):
+            cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+
+        frame_idx += 1
+        metrics.frame_done()
+
+
+LOOPS = {"gui": (run_gui_loop, 6), "obs": (run_obs_loop, 2)}
+
+
+# ---------------------------------------------------------------------------
+# Harness
+# ---------------------------------------------------------------------------
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def benchmark_backend(backend, opts):
+    np.random.seed(opts["seed"])
+    if opts["threads"]:
+        cv2.setNumThreads(opts["threads"])
+
+    load_start = time.perf_counter()
+    detector = RegionFaceSearch(load_backend(backend), enabled=opts["roi_search"])
+    load_time = time.perf_counter() - load_start
+
+    if opts["video"]:
+        source = VideoFileSource(opts["video"], realtime=False, count=opts["frames"])
+    else:
+        source = SyntheticSource(opts["width"], opts["height"], count=opts["frames"],
+                                 seed=opts["seed"], realtime=False)
+
+    loop, default_every = LOOPS[opts["loop"]]
+    metrics = StageMetrics(window=max(opts["frames"], 600))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        loop(detector, source, metrics, opts["detect_every"] or default_every,
+             os.path.join(tmp_dir, "raw_emotion_log.csv"))
+
+    source.release()
+
+    report = metrics.snapshot()
+    return {
+        "load_time_s": load_time,
+        "frames": report["frames"],
+        "elapsed_s": report["elapsed_s"],
+        "throughput_fps": report["fps"],
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": report["stages"],
+    }
+
+
+def run_isolated(backend, opts):
+    """Run one backend in a fresh process so its peak RSS is its own."""
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(benchmark_backend, (backend, opts))
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    regressions = []
+    for backend, current in results.items():
+        previous = baseline.get("results", {}).get(backend)
+        if not previous or "error" in current or "error" in previous:
+            continue
+        if current["throughput_fps"] < previous["throughput_fps"] * (1 - tolerance):
+            regressions.append(f"{backend}: throughput {previous['throughput_fps']:.1f} -> "
+                               f"{current['throughput_fps']:.1f} fps")
+        for stage, stats in current["stages"].items():
+            before = previous["stages"].get(stage)
+            if before and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{backend}/{stage}: p95 {before['p95_ms']:.2f} -> "
+                                   f"{stats['p95_ms']:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline FER pipeline benchmark")
+    parser.add_argument("--backends", nargs="+", default=["stub"], choices=list(BACKENDS),
+                        help="Backends to benchmark")
+    parser.add_argument("--loop", choices=list(LOOPS), default="gui",
+                        help="Which pipeline loop to drive")
+    parser.add_argument("--video", type=str, help="Recorded clip to use instead of synthetic frames")
+    parser.add_argument("--frames", type=int, default=300, help="Frames per run (0 = whole video)")
+    parser.add_argument("--width", type=int, default=1280, help="Synthetic frame width")
+    parser.add_argument("--height", type=int, default=720, help="Synthetic frame height")
+    parser.add_argument("--detect-every", type=int, default=0,
+                        help="Run detection every N frames (default: loop's own cadence)")
+    parser.add_argument("--threads", type=int, default=0, help="cv2.setNumThreads (0 = OpenCV default)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-roi-search", dest="roi_search", action="store_false",
+                        help="Search every frame in full instead of around the previous faces")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="Run backends in this process (peak RSS becomes cumulative)")
+    parser.add_argument("--output", type=str, help="Write JSON report here instead of stdout")
+    parser.add_argument("--baseline", type=str, help="Previous JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    opts = {k: getattr(args, k) for k in
+            ("loop", "video", "frames", "width", "height", "detect_every", "threads", "seed", "roi_search")}
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    results = {}
+    for backend in args.backends:
+        print(f"[BENCH] {backend} ({args.loop} loop)...", file=sys.stderr)
+        try:
+            if args.no_isolate:
+                results[backend] = benchmark_backend(backend, opts)
+            else:
+                results[backend] = run_isolated(backend, opts)
+        except Exception as e:
+            print(f"[BENCH] {backend} failed: {e}", file=sys.stderr)
+            results[backend] = {"error": str(e)}
+
+    report = {
+        "benchmark": {
+            **opts,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"[BENCH] Report saved to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"[BENCH] REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
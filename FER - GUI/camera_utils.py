@@ -1,13 +1,137 @@
+import json
+import os
+import time
+
 import cv2
 
-def get_webcam(fps=30, width=1920, height=1080):
-    cap = cv2.VideoCapture(0)
+CAMERA_MODES_FILE = "camera_modes.json"
+CANDIDATE_FOURCCS = ["MJPG", "YUYV"]
+CANDIDATE_SIZES = [(1920, 1080), (1280, 720), (960, 540), (640, 480), (640, 360)]
+
+def get_webcam(fps=30, width=1920, height=1080, index=0, negotiate=False, reprobe=False, fourcc=None):
+    if negotiate:
+        mode = negotiate_capture_mode(index, width, height, fps, reprobe=reprobe)
+        if mode:
+            fourcc, width, height, fps = mode["fourcc"], mode["width"], mode["height"], mode["fps"]
+
+    cap = cv2.VideoCapture(index)
 
     if not cap.isOpened():
         raise IOError("ERROR: Could not open webcam.")
-    
+
+    apply_capture_mode(cap, width, height, fps, fourcc)
+
+    actual = get_capture_format(cap)
+    if (actual["width"], actual["height"]) != (width, height) or (actual["fps"] and actual["fps"] != fps):
+        print(f"[CAMERA] Requested {width}x{height}@{fps}, device delivered "
+              f"{actual['width']}x{actual['height']}@{actual['fps']:g}")
+
+    return cap
+
+def apply_capture_mode(cap, width, height, fps, fourcc=None):
+    # FOURCC must be set before the size, or many UVC drivers ignore it
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
     cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
     cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
     cap.set(cv2.CAP_PROP_FPS, fps)
-    
-    return cap
\ No newline at end of file
+
+def get_capture_format(cap):
+    code = int(cap.get(cv2.CAP_PROP_FOURCC))
+    return {
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": float(cap.get(cv2.CAP_PROP_FPS) or 0.0),
+        "fourcc": "".join(chr((code >> 8 * i) & 0xFF) for i in range(4)).strip("\x00") if code else "",
+    }
+
+def measure_fps(cap, frames=30, warmup=5):
+    for _ in range(warmup):
+        if not cap.read()[0]:
+            return 0.0
+    start = time.perf_counter()
+    for _ in range(frames):
+        if not cap.read()[0]:
+            return 0.0
+    return frames / (time.perf_counter() - start)
+
+def probe_capture_modes(index, width, height, fps, frames=30):
+    """Try each FOURCC/size combination up to the target and measure what really arrives."""
+    sizes = [(width, height)] + [s for s in CANDIDATE_SIZES
+                                 if s != (width, height) and s[0] <= width and s[1] <= height]
+    results = []
+    for fourcc in CANDIDATE_FOURCCS:
+        for w, h in sizes:
+            cap = cv2.VideoCapture(index)
+            if not cap.isOpened():
+                raise IOError(f"ERROR: Could not open webcam {index} for probing.")
+            apply_capture_mode(cap, w, h, fps, fourcc)
+            actual = get_capture_format(cap)
+            measured = measure_fps(cap, frames=frames)
+            cap.release()
+            result = {"fourcc": fourcc, "requested": [w, h], "width": actual["width"],
+                      "height": actual["height"], "fps": fps, "reported_fps": actual["fps"],
+                      "actual_fourcc": actual["fourcc"], "measured_fps": round(measured, 2)}
+            results.append(result)
+            print(f"[CAMERA] Probe {fourcc} {w}x{h}: got {actual['fourcc'] or '?'} "
+                  f"{actual['width']}x{actual['height']} at {measured:.1f} fps")
+    return results
+
+def choose_capture_mode(results, fps):
+    """Largest frame that sustains ~90% of the target fps, else the fastest mode."""
+    usable = [r for r in results if r["measured_fps"] > 0]
+    if not usable:
+        return None
+    fast_enough = [r for r in usable if r["measured_fps"] >= 0.9 * fps]
+    if fast_enough:
+        return max(fast_enough, key=lambda r: (r["width"] * r["height"], r["measured_fps"]))
+    return max(usable, key=lambda r: (r["measured_fps"], r["width"] * r["height"]))
+
+def device_identity(index):
+    """(device name, capture backend) for a camera index, so a different camera on the same index is told apart."""
+    name = ""
+    sysfs_name = f"/sys/class/video4linux/video{index}/name"
+    if os.path.exists(sysfs_name):
+        try:
+            with open(sysfs_name, "r") as f:
+                name = f.read().strip()
+        except OSError:
+            name = ""
+    cap = cv2.VideoCapture(index)
+    try:
+        backend = cap.getBackendName() if cap.isOpened() else ""
+    except cv2.error:
+        backend = ""
+    cap.release()
+    return name, backend
+
+def negotiate_capture_mode(index, width, height, fps, reprobe=False, cache_path=CAMERA_MODES_FILE):
+    """Return the cached best mode for this device and target, probing on first use."""
+    name, backend = device_identity(index)
+    key = f"{index}:{name or '?'}:{backend or '?'}:{width}x{height}@{fps}"
+    cache = {}
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+    if key in cache and not reprobe:
+        return cache[key]
+
+    print(f"[CAMERA] Probing capture modes for device {index} ({name or 'unnamed'}, "
+          f"{backend or 'unknown backend'}, target {width}x{height}@{fps})...")
+    mode = choose_capture_mode(probe_capture_modes(index, width, height, fps), fps)
+    if mode is None:
+        print("[CAMERA] Probing failed; using the requested mode as-is.")
+        return None
+
+    mode = {"fourcc": mode["fourcc"], "width": mode["requested"][0], "height": mode["requested"][1],
+            "fps": fps, "measured_fps": mode["measured_fps"], "device": name, "backend": backend,
+            "probed_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+    cache[key] = mode
+    with open(cache_path, "w") as f:
+        json.dump(cache, f, indent=4)
+    print(f"[CAMERA] Selected {mode['fourcc']} {mode['width']}x{mode['height']} "
+          f"({mode['measured_fps']:.1f} fps measured)")
+    return mode
\ No newline at end of file
@@ -0,0 +1,85 @@
+import multiprocessing
+import threading
+
+# Seconds a stopping pipeline gets to close its video and log before it is terminated
+STOP_DEADLINE = 10.0
+
+
+class PipelineProcess:
+    """GUI side of the control channel: runs target(control=...) in a process.
+
+    send_config() pushes new settings, which the running pipeline applies
+    on its next frame; stop() asks it to shut down cleanly and only
+    terminates it if that takes longer than the deadline.  UI callers use
+    stop_async(), which waits on a worker thread.
+    """
+
+    def __init__(self, target, **kwargs):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=target, kwargs={**kwargs, "control": child})
+        self.process.start()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def _send(self, message):
+        try:
+            self.conn.send(message)
+            return True
+        except (BrokenPipeError, OSError):
+            return False
+
+    def send_config(self, config):
+        if self.is_alive():
+            self._send(("config", dict(config)))
+
+    def stop(self, deadline=STOP_DEADLINE):
+        """Returns True if the pipeline exited by itself within deadline seconds."""
+        if self.is_alive() and self._send(("stop", None)):
+            self.process.join(deadline)
+        graceful = not self.is_alive()
+        if not graceful:
+            print(f"Pipeline did not stop within {deadline:.0f}s; terminating.")
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        return graceful
+
+    def stop_async(self, deadline=STOP_DEADLINE, done=None):
+        """stop() on a worker thread; done(graceful) runs there when the process is gone.
+
+        The thread is not a daemon, so exiting the GUI still waits for the
+        pipeline to finish its log.
+        """
+        def run():
+            graceful = self.stop(deadline)
+            if done is not None:
+                done(graceful)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+
+class ControlChannel:
+    """Pipeline side: a non-blocking check for messages, made once per frame."""
+
+    def __init__(self, conn=None):
+        self.conn = conn
+
+    def poll(self):
+        """(newest config or None, stop requested)"""
+        config, stop = None, False
+        if self.conn is None:
+            return config, stop
+        try:
+            while self.conn.poll():
+                kind, payload = self.conn.recv()
+                if kind == "config":
+                    config = payload
+                elif kind == "stop":
+                    stop = True
+        except (EOFError, OSError):
+            # The GUI is gone; nothing can stop us any more
+            stop = True
+        return config, stop
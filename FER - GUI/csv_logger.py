@@ -1,39 +1,86 @@
 import csv
 import os
+import time
 from datetime import datetime
+from log_retention import LogRetention, register_session, release_session, segment_path, write_clock_anchor
+from session_index import SessionIndex
 from process_emotion import process_emotion_csv
 
 class EmotionCSVLogger:
-    def __init__(self):
+    def __init__(self, retention=None):
         self.session_dir = None
         self.timestamp = None
         self.raw_csv_path = None
         self.processed_csv_path = None
         self.active = False
+        self.clock_anchor = None
+        self.retention = retention or LogRetention()
+        self.segment = 0
+        self.segment_rows = 0
+        self._compressing = []
 
-    def start_new_log(self):
+    def start_new_log(self, name=None):
         self.timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        if name:
+            self.timestamp = f"{self.timestamp}_{name}"
         self.session_dir = os.path.join("logs", f"session_{self.timestamp}")
         os.makedirs(self.session_dir, exist_ok=True)
+        self.clock_anchor = write_clock_anchor(self.session_dir)
 
         self.raw_csv_path = os.path.join(self.session_dir, f"raw_emotion_log_{self.timestamp}.csv")
         self.processed_csv_path = os.path.join(self.session_dir, f"processed_emotion_log_{self.timestamp}.csv")
+        self.segment = 0
+        self._start_segment()
 
-        with open(self.raw_csv_path, mode='w', newline='') as file:
+        self.active = True
+        register_session(self.session_dir)
+        self.retention.enforce_async()
+
+    def _start_segment(self):
+        with open(segment_path(self.raw_csv_path, self.segment), mode='w', newline='') as file:
             writer = csv.writer(file)
-            writer.writerow(["timestamp", "person_id", "dominant_emotion"])
+            writer.writerow(["capture_ns", "person_id", "dominant_emotion"])
+        self.segment_rows = 0
 
-        self.active = True
+    def _rotate(self):
+        """Close the current segment, compress it in the background and continue in a new one."""
+        closed = segment_path(self.raw_csv_path, self.segment)
+        self.segment += 1
+        self._start_segment()
+        thread = self.retention.compress_async(closed)
+        if thread is not None:
+            self._compressing.append(thread)
 
     def stop(self):
         self.active = False
+        for thread in self._compressing:
+            thread.join()
+        self._compressing = []
         process_emotion_csv(self.raw_csv_path, self.processed_csv_path)
+        if self.session_dir:
+            # Indexed before retention may compress the segments
+            try:
+                SessionIndex(os.path.dirname(self.session_dir)).ingest_session(self.session_dir)
+            except Exception as e:
+                print(f"[INDEX] Could not index {self.session_dir}: {e}")
+            release_session(self.session_dir)
+            self.retention.enforce_async(closed_session=self.session_dir)
 
-    def log(self, person_id: str, emotion: str):
+    def log(self, person_id: str, emotion: str, captured_ns: int = None):
+        """captured_ns: time.monotonic_ns() when the frame was captured (FrameSource.captured_ns).
+
+        Rows are stamped with that integer only; wall-clock times are derived
+        from the session's clock anchor when the log is read.
+        """
         if not self.active or not self.raw_csv_path:
             return
 
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        with open(self.raw_csv_path, mode='a', newline='') as file:
+        if self.retention.segment_rows and self.segment_rows >= self.retention.segment_rows:
+            self._rotate()
+
+        if captured_ns is None:
+            captured_ns = time.monotonic_ns()
+        self.segment_rows += 1
+        with open(segment_path(self.raw_csv_path, self.segment), mode='a', newline='') as file:
             writer = csv.writer(file)
-            writer.writerow([timestamp, person_id, emotion])
\ No newline at end of file
+            writer.writerow([captured_ns, person_id, emotion])
\ No newline at end of file
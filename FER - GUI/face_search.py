@@ -0,0 +1,141 @@
+import time
+
+import numpy as np
+
+
+def _merge_windows(windows):
+    """Union overlapping (x1, y1, x2, y2) windows until none overlap."""
+    windows = [list(w) for w in windows]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(windows)):
+            for j in range(i + 1, len(windows)):
+                a, b = windows[i], windows[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    windows[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del windows[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return windows
+
+
+def _dedupe(boxes, iou=0.5):
+    """Drop boxes overlapping an earlier one by more than iou (faces found twice at window seams)."""
+    kept = []
+    for x, y, w, h in boxes:
+        duplicate = False
+        for kx, ky, kw, kh in kept:
+            ix = max(0, min(x + w, kx + kw) - max(x, kx))
+            iy = max(0, min(y + h, ky + kh) - max(y, ky))
+            inter = ix * iy
+            if inter > iou * (w * h + kw * kh - inter):
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append((x, y, w, h))
+    return kept
+
+
+class RegionFaceSearch:
+    """Wraps a detector so find_faces() only searches around the previous faces.
+
+    Each previous box is grown by ``margin`` of its size on every side
+    (at least ``min_window`` px), overlapping windows are merged, and the
+    face detector runs on those crops only; boxes are shifted back into frame
+    coordinates.  The whole frame is searched every ``sweep_interval``
+    seconds, when no faces are known, or when a window search finds fewer
+    faces than before (a track was lost).
+
+    Everything else (detect_emotions, classify_batch, ...) goes straight to
+    the wrapped detector.  Single-pass backends (``single_pass = True``) are
+    always searched in full, and a backend whose find_faces() returns None
+    (it finds faces inside detect_emotions) is passed straight through.
+    """
+
+    def __init__(self, detector, margin=0.5, sweep_interval=2.0, min_window=96, enabled=True):
+        self.detector = detector
+        self.margin = margin
+        self.sweep_interval = sweep_interval
+        self.min_window = min_window
+        self.enabled = enabled and not getattr(detector, "single_pass", False)
+        self.previous = []
+        self.last_sweep = None
+        self.counts = {"windowed": 0, "periodic": 0, "lost": 0, "empty": 0}
+        self.searches = 0
+        # Searched pixels as a fraction of the frame, summed over searches
+        self.searched_area = 0.0
+
+    @classmethod
+    def from_config(cls, detector, config=None):
+        """Build from the "roi_search" block of config.json."""
+        config = dict(config or {})
+        return cls(detector, margin=config.get("margin", 0.5),
+                   sweep_interval=config.get("sweep_interval", 2.0),
+                   enabled=config.get("enabled", True))
+
+    def __getattr__(self, name):
+        return getattr(self.detector, name)
+
+    def _windows(self, shape):
+        height, width = shape[:2]
+        windows = []
+        for x, y, w, h in self.previous:
+            pad_x = max(int(w * self.margin), (self.min_window - w) // 2, 0)
+            pad_y = max(int(h * self.margin), (self.min_window - h) // 2, 0)
+            windows.append((max(0, x - pad_x), max(0, y - pad_y),
+                            min(width, x + w + pad_x), min(height, y + h + pad_y)))
+        return _merge_windows(windows)
+
+    def _sweep(self, img, bgr, now, reason):
+        faces = self.detector.find_faces(img, bgr=bgr)
+        if faces is None:
+            # Nothing to window around; detect_emotions will search the whole frame
+            self.enabled = False
+            return None
+        self.counts[reason] += 1
+        self.last_sweep = now
+        self.searched_area += 1.0
+        return [tuple(int(v) for v in box) for box in faces]
+
+    def find_faces(self, img, bgr=True, now=None):
+        if not self.enabled:
+            return self.detector.find_faces(img, bgr=bgr)
+        now = time.monotonic() if now is None else now
+        self.searches += 1
+
+        if not self.previous:
+            faces = self._sweep(img, bgr, now, "empty")
+            if faces is None:
+                self.searches -= 1
+                return None
+        elif self.last_sweep is None or now - self.last_sweep >= self.sweep_interval:
+            faces = self._sweep(img, bgr, now, "periodic")
+        else:
+            faces = []
+            area = 0
+            for x1, y1, x2, y2 in self._windows(img.shape):
+                crop = np.ascontiguousarray(img[y1:y2, x1:x2])
+                area += (x2 - x1) * (y2 - y1)
+                for x, y, w, h in self.detector.find_faces(crop, bgr=bgr):
+                    faces.append((int(x) + x1, int(y) + y1, int(w), int(h)))
+            faces = _dedupe(faces)
+            self.searched_area += area / float(img.shape[0] * img.shape[1])
+            if len(faces) < len(self.previous):
+                faces = self._sweep(img, bgr, now, "lost")
+            else:
+                self.counts["windowed"] += 1
+
+        self.previous = faces
+        return faces
+
+    def report(self):
+        if not self.enabled or not self.searches:
+            return
+        sweeps = self.searches - self.counts["windowed"]
+        print(f"[SEARCH] {self.counts['windowed']} of {self.searches} face searches windowed; "
+              f"{sweeps} full sweeps (periodic {self.counts['periodic']}, lost {self.counts['lost']}, "
+              f"empty {self.counts['empty']}); {self.searched_area / self.searches:.0%} of frame area "
+              f"searched on average")
@@ -3,11 +3,48 @@ from fer import FER
 import time
 import os
 import json
-from camera_utils import get_webcam
+import argparse
+from frame_sources import open_source
+from emotion_backends import load_backend
+from face_results import FaceResults
+from face_search import RegionFaceSearch
 from visual_utils import draw_emotion_data, draw_status_text
+from smoothing import EmotionSmoother
 from csv_logger import EmotionCSVLogger
+from log_retention import LogRetention
+from metrics_utils import StageMetrics, start_metrics_server, draw_metrics_hud
+from preprocessing import PreprocessChain
+from scene_gate import SceneGate
+from video_writer import AsyncVideoWriter
+from control_channel import ControlChannel
+from preview import PreviewSink
 
-def run_fer_loop():
+# Values assumed for settings missing from config.json
+DEFAULTS = {"frame_source": 0, "frame_width": 1920, "frame_height": 1080, "fps": 30,
+            "negotiate_capture": False, "emotion_polling_rate": 0.2, "emotion_backend": "fer",
+            "inference_service": "", "metrics_port": 9108}
+# Settings that need the capture reopened when they change at runtime
+CAPTURE_KEYS = {"frame_source", "frame_width", "frame_height", "fps", "negotiate_capture"}
+# Settings that only take effect when the pipeline is started again
+RESTART_KEYS = {"emotion_backend", "inference_service", "metrics_port"}
+
+def open_capture(source, realtime, config):
+    return open_source(
+        source,
+        realtime=realtime,
+        fps=config.get("fps", DEFAULTS["fps"]),
+        width=config.get("frame_width", DEFAULTS["frame_width"]),
+        height=config.get("frame_height", DEFAULTS["frame_height"]),
+        negotiate=config.get("negotiate_capture", DEFAULTS["negotiate_capture"])
+    )
+
+def changed_settings(old, new):
+    return {key for key in set(old) | set(new)
+            if old.get(key, DEFAULTS.get(key)) != new.get(key, DEFAULTS.get(key))}
+
+def run_fer_loop(source=None, realtime=None, headless=None, control=None):
+    """control: pipe end from control_channel.PipelineProcess; new settings sent
+    over it are applied between frames and a stop request ends the loop cleanly."""
     config_path = "config.json"
     if os.path.exists(config_path):
         with open(config_path, "r") as f:
@@ -15,18 +52,35 @@ def run_fer_loop():
     else:
         config = {}
 
-    print("Loading FER emotion detector...")
-    try:
-        detector = FER(mtcnn=True)
-        print("FER detector loaded with MTCNN.")
-    except Exception as e:
-        print(f"Error with MTCNN: {e}")
+    source_fixed = source is not None
+    source = config.get("frame_source", 0) if source is None else source
+    realtime = config.get("source_realtime", True) if realtime is None else realtime
+    headless = config.get("headless", False) if headless is None else headless
+
+    backend = config.get("emotion_backend", "fer")
+    if config.get("inference_service"):
+        print(f"Using shared inference service at {config['inference_service']}")
+        detector = load_backend("remote", url=config["inference_service"])
+    elif backend != "fer":
+        print(f"Loading {backend} emotion backend...")
         try:
-            detector = FER(mtcnn=False)
-            print("FER loaded with OpenCV cascade.")
-        except Exception as e2:
-            print(f"FER loading failed: {e2}")
+            detector = load_backend(backend)
+        except Exception as e:
+            print(f"{backend} backend loading failed: {e}")
             return
+    else:
+        print("Loading FER emotion detector...")
+        try:
+            detector = FER(mtcnn=True)
+            print("FER detector loaded with MTCNN.")
+        except Exception as e:
+            print(f"Error with MTCNN: {e}")
+            try:
+                detector = FER(mtcnn=False)
+                print("FER loaded with OpenCV cascade.")
+            except Exception as e2:
+                print(f"FER loading failed: {e2}")
+                return
 
     emoji_paths = {
         "angry": "emojis/angry.png",
@@ -39,75 +93,210 @@ def run_fer_loop():
     }
 
     try:
-        cap = get_webcam(
-            fps=config.get("capture_fps", 30),
-            width=config.get("frame_width", 1920),
-            height=config.get("frame_height", 1080)
-        )
+        cap = open_capture(source, realtime, config)
     except IOError as e:
         print(e)
         return
 
     prev_time = time.time()
-    last_emotion_time = 0
     emotion_interval = config.get("emotion_polling_rate", 0.2)
-    emotion_history = {}
+    detector = RegionFaceSearch.from_config(detector, config.get("roi_search"))
+    gate = SceneGate.from_config(config.get("scene_gate"), interval=emotion_interval)
     frame_count = 0
-    emotions_data = []
+    results = FaceResults()
+    smoothed = FaceResults()
     logging_active = False
-    csv_logger = EmotionCSVLogger()
+    try:
+        csv_logger = EmotionCSVLogger(retention=LogRetention.from_config(config.get("log_retention")))
+    except ValueError as e:
+        print(f"Invalid log_retention in config: {e}")
+        return
+    recorder = None
 
+    metrics = StageMetrics()
+    if config.get("metrics_port", 9108):
+        start_metrics_server(metrics, port=config.get("metrics_port", 9108))
+
+    try:
+        preprocess = PreprocessChain(config.get("preprocess_chain"), metrics=metrics)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Invalid preprocess_chain in config: {e}")
+        return
+
+    try:
+        smoother = EmotionSmoother.from_config(config.get("smoothing"))
+    except ValueError as e:
+        print(f"Invalid smoothing in config: {e}")
+        return
+
+    control = ControlChannel(control)
+    # Downscaled and drawn on its own thread; recording keeps the full-resolution frame
+    preview = None if headless else PreviewSink.from_config(config.get("preview"))
     print("Starting FER loop... Press 'q' to quit.")
 
     while True:
-        ret, frame = cap.read()
+        new_config, stop_requested = control.poll()
+        if stop_requested:
+            print("Stop requested.")
+            break
+        if new_config is not None:
+            changed = changed_settings(config, new_config)
+            old_config, config = config, new_config
+            emotion_interval = config.get("emotion_polling_rate", 0.2)
+            if changed & CAPTURE_KEYS:
+                # The detector stays loaded; only the camera is reopened
+                cap.release()
+                old_source = source
+                if "frame_source" in changed and not source_fixed:
+                    source = config.get("frame_source", 0)
+                try:
+                    cap = open_capture(source, realtime, config)
+                except (IOError, ValueError) as e:
+                    print(f"{e}\nKeeping the previous capture settings.")
+                    # The device was released to reopen it; go back to what worked
+                    source = old_source
+                    config = dict(config)
+                    for key in changed & CAPTURE_KEYS:
+                        if key in old_config:
+                            config[key] = old_config[key]
+                        else:
+                            config.pop(key, None)
+                    try:
+                        cap = open_capture(source, realtime, config)
+                    except (IOError, ValueError) as e:
+                        print(e)
+                        cap = None
+                        break
+                print(f"Capture reopened: {cap.width}x{cap.height} @ {cap.fps:.0f} fps")
+                results = smoothed = FaceResults()
+                changed |= {"scene_gate", "roi_search"}
+            if changed & {"scene_gate", "emotion_polling_rate"}:
+                gate = SceneGate.from_config(config.get("scene_gate"), interval=emotion_interval)
+            if "roi_search" in changed:
+                detector = RegionFaceSearch.from_config(detector.detector, config.get("roi_search"))
+            try:
+                if "smoothing" in changed:
+                    smoother = EmotionSmoother.from_config(config.get("smoothing"))
+                if "preprocess_chain" in changed:
+                    preprocess = PreprocessChain(config.get("preprocess_chain"), metrics=metrics)
+                if "log_retention" in changed:
+                    csv_logger.retention = LogRetention.from_config(config.get("log_retention"))
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Invalid setting ignored: {e}")
+            if not config.get("logging_toggle", True) and logging_active:
+                csv_logger.stop()
+                logging_active = False
+            if not config.get("record_toggle", False) and recorder is not None:
+                recorder.release()
+                recorder = None
+            if "preview" in changed and preview is not None:
+                preview.close()
+                preview = PreviewSink.from_config(config.get("preview"))
+            if changed & RESTART_KEYS:
+                print(f"Restart detection to apply: {', '.join(sorted(changed & RESTART_KEYS))}")
+            print(f"Settings applied: {', '.join(sorted(changed)) or 'no changes'}")
+
+        with metrics.time("capture"):
+            ret, frame = cap.read()
         if not ret:
-            print("Frame read error.")
+            print("Frame read error." if cap.kind == "webcam" else "End of source.")
             break
 
         frame_count += 1
-        curr_time = time.time()
-
-        frame_copy = cv2.resize(frame, (640, 480))
-        lab = cv2.cvtColor(frame_copy, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        l_clahe = clahe.apply(l)
-        lab_clahe = cv2.merge((l_clahe, a, b))
-        frame_copy = cv2.cvtColor(lab_clahe, cv2.COLOR_LAB2BGR)
-        frame_copy = cv2.GaussianBlur(frame_copy, (5, 5), sigmaX=0.8)
+        now = time.time()
+        # Unpaced sources schedule detection on stream time, not wall time
+        curr_time = now if cap.realtime else cap.media_time()
 
+        # Mirror before detection so boxes line up with the displayed frame
         if config.get("mirror_toggle", False):
             frame = cv2.flip(frame, 1)
 
-        if curr_time - last_emotion_time >= emotion_interval:
+        # Static frames keep the last results; preprocessing only runs on frames sent to the detector
+        with metrics.time("gate"):
+            run_inference = gate.check(frame, results.boxes, curr_time)
+        if run_inference:
             try:
-                emotions_data = detector.detect_emotions(frame_copy)
-                last_emotion_time = curr_time
-                if emotions_data:
-                    dominant_emotion = emotions_data[0]['emotions']
-                    top_emotion = max(dominant_emotion, key=dominant_emotion.get)
-                    if logging_active:
-                        csv_logger.log("user", top_emotion)
+                with metrics.time("preprocess"):
+                    frame_copy = preprocess.apply(frame)
+                with metrics.time("detect"):
+                    faces = detector.find_faces(frame_copy, bgr=True, now=curr_time)
+                with metrics.time("preprocess.roi"):
+                    frame_copy = preprocess.apply_rois(frame_copy, faces)
+                with metrics.time("classify"):
+                    results = FaceResults.from_fer(detector.detect_emotions(frame_copy, face_rectangles=faces))
+                preprocess.to_source(results)
+                # Smoothing only advances when there are new scores
+                with metrics.time("smooth"):
+                    smoothed = smoother.smooth_results(results)
+                if results and logging_active:
+                    with metrics.time("log"):
+                        csv_logger.log("user", results.top_labels()[0], captured_ns=cap.captured_ns)
             except Exception as e:
                 print(f"Emotion detection error: {e}")
 
-        frame = draw_emotion_data(frame, emotions_data, emotion_history, emoji_paths)
+        with metrics.time("overlay"):
+            frame = draw_emotion_data(frame, smoothed, None, emoji_paths, smooth=False, config=config)
+
+            if config.get("fps_toggle", False):
+                fps = 1 / (now - prev_time) if now != prev_time else 0
+                prev_time = now
+                draw_status_text(frame, fps, frame_count)
 
-        if config.get("fps_toggle", False):
-            fps = 1 / (curr_time - prev_time) if curr_time != prev_time else 0
-            prev_time = curr_time
-            draw_status_text(frame, fps, frame_count)
+            if config.get("metrics_hud_toggle", False):
+                draw_metrics_hud(frame, metrics)
+
+        key = -1
+        if preview is not None:
+            with metrics.time("output"):
+                preview.show(frame)
+                key = preview.key()
 
-        cv2.imshow("Emoji Cam", frame)
         if config.get("logging_toggle", True) and not logging_active:
             csv_logger.start_new_log()
             logging_active = True
 
-        key = cv2.waitKey(1) & 0xFF
+        if config.get("record_toggle", False):
+            if recorder is None:
+                # Keep the video next to the session's emotion log
+                record_dir = csv_logger.session_dir or "logs"
+                os.makedirs(record_dir, exist_ok=True)
+                record_path = os.path.join(record_dir, f"recording_{time.strftime('%Y-%m-%d_%H-%M-%S')}.avi")
+                record_size = (config.get("record_width", 0), config.get("record_height", 0))
+                recorder = AsyncVideoWriter(record_path,
+                                            fps=config.get("record_fps", 0) or cap.fps,
+                                            size=record_size if all(record_size) else None,
+                                            codec=config.get("record_codec", "XVID"),
+                                            block=not cap.realtime)
+                print(f"Recording session video to {record_path}")
+            with metrics.time("output"):
+                recorder.write(frame)
+
+        metrics.frame_done()
         if key == 27 or key == ord('q'):
             break
 
-    cap.release()
-    cv2.destroyAllWindows()
-    print("FER session ended.")
\ No newline at end of file
+    if cap is not None:
+        cap.release()
+    if recorder is not None:
+        recorder.release()
+    if preview is not None:
+        preview.close()
+    if not headless:
+        cv2.destroyAllWindows()
+    # Rows are already on disk; stop() closes the session and writes the smoothed log and charts
+    if logging_active:
+        csv_logger.stop()
+    gate.report(metrics)
+    detector.report()
+    print("FER session ended.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the FER loop on a webcam or recorded data")
+    parser.add_argument("--source", default=None,
+                        help="Webcam index, video file, image folder or 'synthetic[:WxH]'")
+    parser.add_argument("--fast", action="store_true",
+                        help="Process recorded sources as fast as possible instead of in real time")
+    parser.add_argument("--headless", action="store_true", help="Do not open a preview window")
+    args = parser.parse_args()
+    run_fer_loop(source=args.source, realtime=False if args.fast else None,
+                 headless=True if args.headless else None)
\ No newline at end of file
@@ -1,27 +1,38 @@
 import tkinter as tk
 from tkinter import ttk
-from multiprocessing import Process
+from control_channel import PipelineProcess
 from fer_pipeline import run_fer_loop
 from settings import edit_settings, clear_logs
 from process_emotion import visualize_logs
 
 fer_process = None
+# Worker thread waiting for a stopped pipeline to exit
+stopping = None
 
 def start_detection():
     global fer_process
-    if fer_process is None or not fer_process.is_alive():
-        fer_process = Process(target=run_fer_loop)
-        fer_process.start()
+    if stopping is not None and stopping.is_alive():
+        # The old pipeline still holds the camera and its log
+        print("FER is still stopping; try again in a moment.")
+    elif fer_process is None or not fer_process.is_alive():
+        fer_process = PipelineProcess(run_fer_loop)
         print("FER process started.")
     else:
         print("FER is already running.")
 
 def stop_detection():
-    global fer_process
+    global fer_process, stopping
     if fer_process is not None:
-        fer_process.terminate()
-        fer_process.join()
-        print("FER process terminated.")
+        # Lets the pipeline close its video and emotion log instead of killing it,
+        # waiting on a worker thread so the window stays responsive
+        stopping = fer_process.stop_async(done=lambda graceful: print("FER process stopped."))
+        fer_process = None
+        print("Stopping FER process...")
+
+def apply_settings(config):
+    # A running pipeline picks the new settings up on its next frame
+    if fer_process is not None and fer_process.is_alive():
+        fer_process.send_config(config)
 
 def on_exit():
     stop_detection()
@@ -45,7 +56,7 @@ def main():
     tk.Button(root, text="Stop Detection", command=stop_detection,
               height=2, width=button_width, bg="white").pack(pady=8)
 
-    tk.Button(root, text="Settings", command=lambda: edit_settings(root),
+    tk.Button(root, text="Settings", command=lambda: edit_settings(root, on_save=apply_settings),
               height=2, width=button_width, bg="white").pack(pady=8)
 
     tk.Button(root, text="Visualize Logs", command=visualize_logs,
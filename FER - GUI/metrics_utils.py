@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+PIPELINE_STAGES = [
+    "capture",
+    "preprocess",
+    "detect",
+    "classify",
+    "smooth",
+    "overlay",
+    "output",
+    "log",
+]
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageMetrics:
+    """Rolling per-stage latency histograms timed with a monotonic clock."""
+
+    def __init__(self, window=600, stages=PIPELINE_STAGES):
+        self.window = window
+        self._samples = {stage: deque(maxlen=window) for stage in stages}
+        self._totals = {stage: [0.0, 0] for stage in stages}
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.window)
+                self._totals[stage] = [0.0, 0]
+            self._samples[stage].append(seconds)
+            self._totals[stage][0] += seconds
+            self._totals[stage][1] += 1
+
+    def frame_done(self):
+        with self._lock:
+            self.frames += 1
+
+    def percentiles(self, stage):
+        """Return {quantile: seconds} over the rolling window, or {} if empty."""
+        with self._lock:
+            samples = np.fromiter(self._samples.get(stage, ()), dtype=np.float64)
+        if samples.size == 0:
+            return {}
+        values = np.quantile(samples, QUANTILES)
+        return dict(zip(QUANTILES, values.tolist()))
+
+    def snapshot(self):
+        """Per-stage p50/p95/p99 in milliseconds plus totals, for reports."""
+        with self._lock:
+            stages = list(self._samples)
+            totals = {stage: tuple(total) for stage, total in self._totals.items()}
+            frames = self.frames
+        elapsed = time.perf_counter() - self.started
+        report = {"frames": frames,
+                  "elapsed_s": elapsed,
+                  "fps": frames / elapsed if elapsed > 0 else 0.0,
+                  "stages": {}}
+        for stage in stages:
+            quantiles = self.percentiles(stage)
+            if not quantiles:
+                continue
+            total, count = totals[stage]
+            report["stages"][stage] = {
+                "count": count,
+                "mean_ms": total / count * 1000,
+                **{f"p{int(q * 100)}_ms": v * 1000 for q, v in quantiles.items()},
+            }
+        return report
+
+    def to_prometheus(self):
+        with self._lock:
+            stages = list(self._samples)
+            totals = {stage: tuple(total) for stage, total in self._totals.items()}
+            frames = self.frames
+
+        lines = [
+            "# HELP fer_stage_latency_seconds Pipeline stage latency over a rolling window.",
+            "# TYPE fer_stage_latency_seconds summary",
+        ]
+        for stage in stages:
+            for q, value in self.percentiles(stage).items():
+                lines.append(f'fer_stage_latency_seconds{{stage="{stage}",quantile="{q}"}} {value:.9f}')
+            total, count = totals[stage]
+            lines.append(f'fer_stage_latency_seconds_sum{{stage="{stage}"}} {total:.9f}')
+            lines.append(f'fer_stage_latency_seconds_count{{stage="{stage}"}} {count}')
+        lines += [
+            "# HELP fer_frames_total Frames processed since start.",
+            "# TYPE fer_frames_total counter",
+            f"fer_frames_total {frames}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(metrics, port=9108, host="127.0.0.1"):
+    """Serve metrics.to_prometheus() at http://host:port/metrics on a daemon thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"[METRICS] Could not bind {host}:{port}: {e}")
+        return None
+
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[METRICS] Serving on http://{host}:{port}/metrics")
+    return server
+
+
+def draw_metrics_hud(frame, metrics, origin=(10, 120)):
+    x, y = origin
+    cv2.putText(frame, "stage      p50    p95    p99 (ms)", (x, y),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 255), 1)
+    for stage in PIPELINE_STAGES:
+        quantiles = metrics.percentiles(stage)
+        if not quantiles:
+            continue
+        y += 18
+        p50, p95, p99 = (quantiles[q] * 1000 for q in QUANTILES)
+        cv2.putText(frame, f"{stage:<10}{p50:6.1f} {p95:6.1f} {p99:6.1f}", (x, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+    return frame
@@ -0,0 +1,270 @@
+"""multi_cam.py
+--------------------------------
+Several cameras (or recordings) sharing one emotion model.  Each source
+is read on its own capture thread; a single inference engine collects
+the newest frame of every stream whose polling interval has elapsed,
+runs face detection per frame and classifies all face crops of the
+round in one batched model call.  Every stream keeps its own overlay,
+window and log session.  Per-stream fps and a fairness index are
+printed periodically.
+
+```bash
+python multi_cam.py --sources 0 1 2
+python multi_cam.py --sources a.mp4 b.mp4 --fast --headless --backend stub
+```
+"""
+
+import argparse
+import threading
+import time
+
+import cv2
+
+from csv_logger import EmotionCSVLogger
+from emotion_backends import BACKENDS, classify_batch, load_backend
+from face_results import FaceResults
+from frame_sources import open_source
+from smoothing import METHODS, EmotionSmoother
+from visual_utils import draw_emotion_data, emotion_colors
+
+EMOJI_PATHS = {
+    "angry": "emojis/angry.png",
+    "disgust": "emojis/disgust.png",
+    "fear": "emojis/fear.png",
+    "happy": "emojis/happy.png",
+    "sad": "emojis/sad.png",
+    "surprise": "emojis/surprised.png",
+    "neutral": "emojis/neutral.png",
+}
+
+
+class Stream:
+    def __init__(self, stream_id, spec, source, log=True, smoothing="ema"):
+        self.id = stream_id
+        self.spec = spec
+        self.source = source
+        self.window = f"Stream {stream_id}: {spec}"
+        self.lock = threading.Lock()
+        self.frame = None
+        self.frame_seq = 0
+        self.frame_ns = 0
+        self.inferred_seq = 0
+        self.displayed_seq = 0
+        self.last_inference = 0.0
+        self.results = FaceResults()
+        self.smoother = EmotionSmoother(method=smoothing)
+        self.tally = {emotion: 0 for emotion in emotion_colors}
+        self.finished = False
+        self.counts = {"captured": 0, "inferred": 0, "displayed": 0}
+
+        self.csv_logger = EmotionCSVLogger()
+        if log:
+            self.csv_logger.start_new_log(name=f"stream{stream_id}")
+
+    def capture_loop(self, stop_event):
+        while not stop_event.is_set():
+            ret, frame = self.source.read()
+            if not ret:
+                if self.source.kind == "webcam":
+                    time.sleep(0.05)
+                    continue
+                break
+            with self.lock:
+                self.frame = frame
+                self.frame_seq += 1
+                self.frame_ns = self.source.captured_ns
+            self.counts["captured"] += 1
+        self.finished = True
+
+    def latest(self):
+        """(frame, seq, captured_ns) of the newest captured frame."""
+        with self.lock:
+            return self.frame, self.frame_seq, self.frame_ns
+
+    def set_results(self, emotions_data, seq, captured_ns=None):
+        results = FaceResults.from_fer(emotions_data)
+        self.results = self.smoother.smooth_results(results)
+        self.inferred_seq = seq
+        self.counts["inferred"] += 1
+        for track_id, label in zip(results.track_ids.tolist(), results.top_labels()):
+            self.csv_logger.log(f"face_{track_id}", label, captured_ns=captured_ns)
+
+
+class InferenceEngine:
+    """One detector serving every stream, batching face crops per round."""
+
+    def __init__(self, detector, streams, interval=0.2, max_batch=8):
+        self.detector = detector
+        self.streams = streams
+        self.interval = interval
+        self.max_batch = max_batch
+        self.next_stream = 0
+        self.rounds = 0
+        self.batched_frames = 0
+        self.busy_time = 0.0
+
+    def collect_due(self):
+        now = time.perf_counter()
+        due = []
+        count = len(self.streams)
+        # Start each round at a different stream so none is starved when max_batch < streams
+        for offset in range(count):
+            stream = self.streams[(self.next_stream + offset) % count]
+            frame, seq, captured_ns = stream.latest()
+            if frame is None or seq == stream.inferred_seq:
+                continue
+            if now - stream.last_inference < self.interval:
+                continue
+            stream.last_inference = now
+            due.append((stream, frame, seq, captured_ns))
+            if len(due) >= self.max_batch:
+                break
+        self.next_stream = (self.next_stream + 1) % count
+        return due
+
+    def run(self, stop_event):
+        while not stop_event.is_set():
+            due = self.collect_due()
+            if not due:
+                if all(stream.finished for stream in self.streams):
+                    break
+                time.sleep(0.002)
+                continue
+
+            start = time.perf_counter()
+            try:
+                items = [(frame, self.detector.find_faces(frame, bgr=True)) for _, frame, _, _ in due]
+                results = classify_batch(self.detector, items)
+            except Exception as e:
+                print(f"[MULTI] Inference error: {e}")
+                continue
+            self.busy_time += time.perf_counter() - start
+
+            for (stream, _, seq, captured_ns), emotions_data in zip(due, results):
+                stream.set_results(emotions_data, seq, captured_ns)
+            self.rounds += 1
+            self.batched_frames += len(due)
+
+
+def jain_fairness(values):
+    """1.0 when every stream gets the same share, 1/n when one stream gets everything."""
+    total = sum(values)
+    squares = sum(v * v for v in values)
+    return total * total / (len(values) * squares) if squares else 1.0
+
+
+def report(streams, engine, elapsed, previous):
+    rates = []
+    for stream in streams:
+        delta = {k: v - previous[stream.id][k] for k, v in stream.counts.items()}
+        previous[stream.id] = dict(stream.counts)
+        if delta["captured"]:
+            rates.append(delta["inferred"] / elapsed)
+        print(f"[MULTI] stream {stream.id}: capture {delta['captured'] / elapsed:5.1f} fps, "
+              f"display {delta['displayed'] / elapsed:5.1f} fps, "
+              f"inference {delta['inferred'] / elapsed:4.1f} Hz")
+    avg_batch = engine.batched_frames / engine.rounds if engine.rounds else 0
+    fairness = jain_fairness(rates) if rates else 1.0
+    busy = engine.busy_time - previous.get("engine_busy", 0.0)
+    previous["engine_busy"] = engine.busy_time
+    print(f"[MULTI] fairness {fairness:.3f} over {len(rates)} live stream(s), "
+          f"avg batch {avg_batch:.2f} frames, engine busy {100 * busy / elapsed:.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-camera FER with one shared model")
+    parser.add_argument("--sources", nargs="+", default=["0", "1"],
+                        help="Webcam indices, video files, image folders or 'synthetic[:WxH]'")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="fer")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--interval", type=float, default=0.2,
+                        help="Per-stream seconds between inferences")
+    parser.add_argument("--max-batch", type=int, default=8,
+                        help="Most frames combined into one inference round")
+    parser.add_argument("--smoothing", choices=METHODS, default="ema", help="Per-stream score smoothing")
+    parser.add_argument("--fast", action="store_true", help="Do not pace recorded sources")
+    parser.add_argument("--headless", action="store_true", help="No preview windows")
+    parser.add_argument("--no-log", action="store_true", help="Do not start log sessions")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Seconds between fps reports")
+    args = parser.parse_args()
+
+    print(f"Loading {args.backend} backend once for {len(args.sources)} stream(s)...")
+    detector = load_backend(args.backend)
+
+    streams = []
+    for stream_id, spec in enumerate(args.sources):
+        try:
+            source = open_source(spec, realtime=not args.fast, width=args.width,
+                                 height=args.height, fps=args.fps)
+        except IOError as e:
+            print(f"[MULTI] Skipping {spec}: {e}")
+            continue
+        streams.append(Stream(stream_id, spec, source, log=not args.no_log, smoothing=args.smoothing))
+    if not streams:
+        print("[MULTI] No sources could be opened.")
+        return
+
+    stop_event = threading.Event()
+    engine = InferenceEngine(detector, streams, args.interval, args.max_batch)
+    threads = [threading.Thread(target=stream.capture_loop, args=(stop_event,), daemon=True)
+               for stream in streams]
+    threads.append(threading.Thread(target=engine.run, args=(stop_event,), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    print("Press 'q' or ESC in any window (Ctrl-C when headless) to quit.")
+    previous = {stream.id: dict(stream.counts) for stream in streams}
+    last_report = time.perf_counter()
+    try:
+        while True:
+            drew = False
+            for stream in streams:
+                frame, seq, _ = stream.latest()
+                if frame is None or seq == stream.displayed_seq:
+                    continue
+                stream.displayed_seq = seq
+                frame = frame.copy()
+                frame = draw_emotion_data(frame, stream.results, None, EMOJI_PATHS,
+                                          smooth=False, tally=stream.tally)
+                if not args.headless:
+                    cv2.imshow(stream.window, frame)
+                stream.counts["displayed"] += 1
+                drew = True
+
+            if not args.headless:
+                key = cv2.waitKey(1) & 0xFF
+                if key == 27 or key == ord('q'):
+                    break
+            elif not drew:
+                time.sleep(0.002)
+
+            now = time.perf_counter()
+            if now - last_report >= args.report_every:
+                report(streams, engine, now - last_report, previous)
+                last_report = now
+
+            if all(stream.finished for stream in streams) and not threads[-1].is_alive():
+                break
+    except KeyboardInterrupt:
+        print("Interrupted - shutting down...")
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join(timeout=2.0)
+        for stream in streams:
+            stream.source.release()
+            if stream.csv_logger.active:
+                stream.csv_logger.stop()
+        if not args.headless:
+            cv2.destroyAllWindows()
+
+    elapsed = time.perf_counter() - last_report
+    if elapsed > 0.5:
+        report(streams, engine, elapsed, previous)
+    print("Multi-camera session ended.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import cv2
+
+# Matches the enhancement fer_pipeline always applied before detection
+DEFAULT_CHAIN = [
+    {"op": "resize", "width": 640, "height": 480},
+    {"op": "clahe", "clip_limit": 2.0, "tile_grid": 8},
+    {"op": "blur", "ksize": 5, "sigma": 0.8},
+]
+
+
+class Resize:
+    def __init__(self, width=640, height=480):
+        self.size = (int(width), int(height))
+
+    def __call__(self, img):
+        if (img.shape[1], img.shape[0]) == self.size:
+            return img
+        return cv2.resize(img, self.size)
+
+
+class CLAHE:
+    """Contrast-limited histogram equalisation on the L channel of LAB."""
+
+    def __init__(self, clip_limit=2.0, tile_grid=8):
+        self.clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tile_grid, tile_grid))
+
+    def __call__(self, img):
+        lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+        lab[:, :, 0] = self.clahe.apply(lab[:, :, 0])
+        return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+
+
+class GaussianBlur:
+    def __init__(self, ksize=5, sigma=0.8):
+        self.ksize = (int(ksize), int(ksize))
+        self.sigma = sigma
+
+    def __call__(self, img):
+        return cv2.GaussianBlur(img, self.ksize, sigmaX=self.sigma)
+
+
+OPERATORS = {
+    "resize": Resize,
+    "clahe": CLAHE,
+    "blur": GaussianBlur,
+}
+
+
+class PreprocessChain:
+    """Configured preprocessing, built once and applied only to frames sent to the detector.
+
+    Each step is {"op": name, "scope": "frame" | "roi", **params}.  Frame
+    steps run before face detection; roi steps run afterwards on a padded
+    region around each detected face only.  A resize step scales the
+    detection frame, so boxes are mapped back with to_source().
+    """
+
+    def __init__(self, steps=None, metrics=None, roi_padding=0.25):
+        self.frame_steps = []
+        self.roi_steps = []
+        self.metrics = metrics
+        self.roi_padding = roi_padding
+        for step in DEFAULT_CHAIN if steps is None else steps:
+            params = {k: v for k, v in step.items() if k not in ("op", "scope")}
+            if step["op"] not in OPERATORS:
+                raise ValueError(f"Unknown preprocessing op '{step['op']}'. "
+                                 f"Choose from: {', '.join(OPERATORS)}")
+            if step.get("scope", "frame") == "roi" and step["op"] == "resize":
+                raise ValueError("resize can only be applied to the whole frame")
+            target = self.roi_steps if step.get("scope", "frame") == "roi" else self.frame_steps
+            target.append((step["op"], OPERATORS[step["op"]](**params)))
+        self.scale = (1.0, 1.0)
+
+    def _run(self, steps, img):
+        for name, op in steps:
+            if self.metrics is None:
+                img = op(img)
+                continue
+            with self.metrics.time(f"preprocess.{name}"):
+                img = op(img)
+        return img
+
+    def apply(self, frame):
+        """Run the frame-scope steps; returns the image to detect faces on."""
+        out = self._run(self.frame_steps, frame)
+        if out is frame and self.roi_steps:
+            # roi steps write in place; never into the frame being displayed
+            out = frame.copy()
+        self.scale = (frame.shape[1] / out.shape[1], frame.shape[0] / out.shape[0])
+        return out
+
+    def apply_rois(self, img, faces):
+        """Enhance each face region of img (from apply()) in place with the roi-scope steps."""
+        if not self.roi_steps or faces is None or len(faces) == 0:
+            return img
+        height, width = img.shape[:2]
+        for x, y, w, h in faces:
+            pad_x, pad_y = int(w * self.roi_padding), int(h * self.roi_padding)
+            x1, y1 = max(0, x - pad_x), max(0, y - pad_y)
+            x2, y2 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            img[y1:y2, x1:x2] = self._run(self.roi_steps, img[y1:y2, x1:x2])
+        return img
+
+    def to_source(self, results):
+        """Scale a FaceResults' boxes from detection-frame back to source-frame coordinates."""
+        return results.scale(*self.scale)
@@ -1,20 +1,27 @@
+import numpy as np
 import pandas as pd
 from collections import Counter
 import matplotlib.pyplot as plt
 import os
-from tkinter import filedialog, messagebox
 import subprocess
+import time
+from artifact_cache import ArtifactCache
+from face_results import EMOTION_LABELS
+from log_retention import log_segments, read_log, strip_log_suffix
 
 def visualize_logs():
+    # Imported here so batch and headless processing work without Tk
+    from tkinter import filedialog, messagebox
+
     file_path = filedialog.askopenfilename(
         title="Select Emotion Log CSV",
-        filetypes=[("CSV files", "*.csv")]
+        filetypes=[("Emotion logs", "*.csv *.csv.gz *.csv.zst"), ("CSV files", "*.csv")]
     )
     if not file_path:
         return
 
     try:
-        output_csv = file_path.replace(".csv", "_smoothed.csv")
+        output_csv = strip_log_suffix(file_path) + "_smoothed.csv"
         process_emotion_csv(file_path, output_csv)
 
         # Open the two images generated by the process
@@ -31,18 +38,50 @@ def visualize_logs():
     except Exception as e:
         messagebox.showerror("Error", f"Could not visualize logs:\n{e}")
 
-def process_emotion_csv(input_csv, output_csv, window_size=25):
-    if not os.path.exists(input_csv):
+def artifact_paths(output_csv):
+    """Cache names -> paths of everything process_emotion_csv writes for output_csv."""
+    session_dir = os.path.dirname(output_csv)
+    base_name = os.path.splitext(os.path.basename(output_csv))[0]
+    return {
+        "smoothed.csv": output_csv,
+        "distribution.png": os.path.join(session_dir, f"{base_name}_distribution.png"),
+        "timeline.png": os.path.join(session_dir, f"{base_name}_timeline.png"),
+    }
+
+def process_emotion_csv(input_csv, output_csv, window_size=25, cache=None):
+    """input_csv may be rotated into segments and/or compressed (.gz, .zst); all segments are read.
+
+    The smoothed CSV and both charts are cached under ArtifactCache.key: each
+    segment's name without its compression suffix, a digest of its
+    decompressed content, and window_size.  An unchanged log is served from
+    the cache without reprocessing, even after it has been compressed.
+    """
+    segments = log_segments(input_csv)
+    if not segments:
         print(f"[PROCESS] File not found: {input_csv}")
         return
 
-    df = pd.read_csv(input_csv)
+    outputs = artifact_paths(output_csv)
+    cache = cache or ArtifactCache()
+    key = cache.key(segments, window_size=window_size)
+    started = time.perf_counter()
+    if cache.fetch(key, outputs):
+        print(f"[CACHE] {output_csv} and charts reused "
+              f"({(time.perf_counter() - started) * 1000:.1f} ms, input unchanged)")
+        return
+
+    df = read_log(input_csv)
+
     if df.empty:
         print("[PROCESS] CSV is empty. Skipping processing.")
         return
 
     emotions = df['dominant_emotion'].tolist()
-    timestamps = df['timestamp'].tolist()
+    timestamps = df['timestamp']
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        # Raw logs hold monotonic nanoseconds; readable times are only rendered here
+        timestamps = timestamps.dt.strftime('%Y-%m-%d %H:%M:%S.%f').str[:-3]
+    timestamps = timestamps.tolist()
 
     smoothed = []
     for i in range(len(emotions)):
@@ -54,10 +93,9 @@ def process_emotion_csv(input_csv, output_csv, window_size=25):
     out_df.to_csv(output_csv, index=False)
     print(f"[PROCESS] Smoothed emotion log saved to {output_csv}")
 
-    session_dir = os.path.dirname(output_csv)
-    base_name = os.path.splitext(os.path.basename(output_csv))[0]
-    plot_bar_chart(out_df, os.path.join(session_dir, f"{base_name}_distribution.png"))
-    plot_time_series(out_df, os.path.join(session_dir, f"{base_name}_timeline.png"))
+    plot_bar_chart(out_df, outputs["distribution.png"])
+    plot_time_series(out_df, outputs["timeline.png"])
+    cache.store(key, outputs)
 
 def plot_bar_chart(df, output_img_path):
     emotion_counts = df['smoothed_emotion'].value_counts().sort_values(ascending=True)
@@ -74,24 +112,68 @@ def plot_bar_chart(df, output_img_path):
 
     print(f"[PLOT] Bar chart saved: {output_img_path}")
 
-def plot_time_series(df, output_img_path):
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df = df.sort_values('timestamp')
-
-    emotion_levels = {emotion: i for i, emotion in enumerate(df['smoothed_emotion'].unique())}
-    reverse_levels = {v: k for k, v in emotion_levels.items()}
-    df['emotion_id'] = df['smoothed_emotion'].map(emotion_levels)
-
-    plt.figure(figsize=(12, 5))
-    plt.scatter(df['timestamp'], df['emotion_id'], color='purple', s=30)
-    plt.yticks(list(reverse_levels.keys()), list(reverse_levels.values()))
-    plt.xticks(rotation=45)
-    plt.title("Smoothed Emotion Over Time")
-    plt.xlabel("Timestamp")
-    plt.ylabel("Emotion")
-    plt.grid(True, linestyle='--', alpha=0.6)
-    plt.tight_layout()
-    plt.savefig(output_img_path)
-    plt.close()
+# Candidate bucket sizes in seconds; the smallest giving at most TIMELINE_BUCKETS buckets is used
+BUCKET_SIZES = [1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 21600, 86400]
+TIMELINE_BUCKETS = 200
+
+def pick_bucket(span_seconds, max_buckets=TIMELINE_BUCKETS):
+    for size in BUCKET_SIZES:
+        if span_seconds / size <= max_buckets:
+            return size
+    return BUCKET_SIZES[-1]
+
+def bucket_emotions(df, max_buckets=TIMELINE_BUCKETS):
+    """Rows per (time bucket, emotion) as a bucket start x emotion DataFrame, plus the bucket size.
+
+    The bucket size grows with the session length so the chart always has
+    at most max_buckets columns, whatever the number of rows.
+    """
+    times = pd.to_datetime(df['timestamp'], format='ISO8601').values.astype('datetime64[s]').astype(np.int64)
+    codes, emotions = pd.factorize(df['smoothed_emotion'])
+    start = times.min()
+    bucket = pick_bucket(times.max() - start + 1, max_buckets)
+    start -= start % bucket
+    slots = (times - start) // bucket
+    n_slots = int(slots.max()) + 1
+    counts = np.bincount(slots * len(emotions) + codes, minlength=n_slots * len(emotions))
+    counts = counts.reshape(n_slots, len(emotions))
+
+    order = [e for e in EMOTION_LABELS if e in emotions] + [e for e in emotions if e not in EMOTION_LABELS]
+    index = pd.to_datetime(start + np.arange(n_slots) * bucket, unit='s')
+    table = pd.DataFrame(counts, index=index, columns=list(emotions))[order]
+    return table, bucket
 
-    print(f"[PLOT] Timeline scatter plot saved: {output_img_path}")
\ No newline at end of file
+def plot_time_series(df, output_img_path):
+    """Emotion share per time bucket as stacked areas, with the dominant emotion of each bucket below."""
+    table, bucket = bucket_emotions(df)
+    totals = table.sum(axis=1)
+    # Buckets without rows (no faces, paused capture) are drawn empty rather than bridged
+    shares = table.div(totals.where(totals > 0), axis=0).fillna(0)
+    colors = {e: plt.cm.tab10(i) for i, e in enumerate(EMOTION_LABELS)}
+    palette = [colors.get(e, 'gray') for e in shares.columns]
+    width = pd.Timedelta(seconds=bucket)
+
+    fig, (ax_share, ax_dominant) = plt.subplots(2, 1, figsize=(12, 5), sharex=True,
+                                                gridspec_kw={'height_ratios': [5, 1]})
+    # One extra edge so the last bucket is drawn its full width
+    edges = shares.index.append(pd.DatetimeIndex([shares.index[-1] + width]))
+    values = np.vstack([shares.values, shares.values[-1:]]).T
+    ax_share.stackplot(edges, values, labels=shares.columns, colors=palette, step='post')
+    ax_share.set_ylim(0, 1)
+    ax_share.set_ylabel("Share")
+    ax_share.set_title(f"Smoothed Emotion Over Time ({bucket}s buckets)")
+    ax_share.legend(loc='upper left', bbox_to_anchor=(1.0, 1.0))
+    ax_share.grid(True, linestyle='--', alpha=0.6)
+
+    dominant = shares[totals > 0].idxmax(axis=1)
+    ax_dominant.bar(dominant.index, 1, width=width, align='edge',
+                    color=[colors.get(e, 'gray') for e in dominant])
+    ax_dominant.set_yticks([])
+    ax_dominant.set_ylabel("Dominant", rotation=0, ha='right', va='center')
+    ax_dominant.set_xlabel("Timestamp")
+    plt.setp(ax_dominant.get_xticklabels(), rotation=45)
+    fig.tight_layout()
+    fig.savefig(output_img_path)
+    plt.close(fig)
+
+    print(f"[PLOT] Timeline saved ({len(df)} rows in {len(shares)} buckets of {bucket}s): {output_img_path}")
\ No newline at end of file
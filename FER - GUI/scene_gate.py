@@ -0,0 +1,127 @@
+import cv2
+import numpy as np
+
+# Stages that make up one inference, for estimating the time saved by skips
+INFERENCE_STAGES = ("preprocess", "detect", "preprocess.roi", "classify")
+
+
+class SceneGate:
+    """Decides per frame whether to run inference, from cheap thumbnail differences.
+
+    Every frame is reduced to a ~``thumb_width`` px grayscale thumbnail by
+    strided sampling and compared with the thumbnail of the last inferred
+    frame, over the whole frame and inside each (padded) face box.
+
+    * A scene change (global mean difference >= ``scene_threshold``) runs
+      inference immediately, even between polling ticks.
+    * On a polling tick, inference runs if any face ROI moved by at least
+      ``motion_threshold``, or if the last results are ``max_skip`` seconds
+      old; otherwise the tick is skipped and the last results are reused.
+
+    With ``enabled=False`` the gate is the plain polling timer.
+    """
+
+    def __init__(self, interval=0.2, enabled=True, motion_threshold=6.0, scene_threshold=30.0,
+                 max_skip=2.0, thumb_width=96, roi_padding=0.2):
+        self.interval = interval
+        self.enabled = enabled
+        self.motion_threshold = motion_threshold
+        self.scene_threshold = scene_threshold
+        self.max_skip = max_skip
+        self.thumb_width = thumb_width
+        self.roi_padding = roi_padding
+        self.reference = None
+        self.last_tick = None
+        self.last_run = None
+        self.counts = {"first": 0, "scene": 0, "motion": 0, "refresh": 0, "timer": 0, "skipped": 0}
+
+    @classmethod
+    def from_config(cls, config=None, interval=0.2):
+        """Build from the "scene_gate" block of config.json."""
+        config = dict(config or {})
+        return cls(interval=interval, enabled=config.get("enabled", True),
+                   motion_threshold=config.get("motion_threshold", 6.0),
+                   scene_threshold=config.get("scene_threshold", 30.0),
+                   max_skip=config.get("max_skip", 2.0))
+
+    def _thumb(self, frame):
+        step = max(1, frame.shape[1] // self.thumb_width)
+        small = np.ascontiguousarray(frame[::step, ::step])
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small, step
+
+    def _roi_motion(self, diff, boxes, step):
+        height, width = diff.shape
+        motion = 0.0
+        for x, y, w, h in np.asarray(boxes).reshape(-1, 4) // step:
+            pad_x, pad_y = int(w * self.roi_padding), int(h * self.roi_padding)
+            x1, y1 = max(0, x - pad_x), max(0, y - pad_y)
+            x2, y2 = min(width, x + w + pad_x + 1), min(height, y + h + pad_y + 1)
+            if x2 > x1 and y2 > y1:
+                motion = max(motion, float(diff[y1:y2, x1:x2].mean()))
+        return motion
+
+    def check(self, frame, boxes, now):
+        """True if inference should run on this frame; boxes are the current results' boxes."""
+        due = self.last_tick is None or now - self.last_tick >= self.interval
+        if not self.enabled:
+            if due:
+                self.last_tick = now
+                self.counts["timer"] += 1
+            return due
+
+        small, step = self._thumb(frame)
+        if self.reference is None or self.reference.shape != small.shape:
+            reason = "first"
+        else:
+            diff = cv2.absdiff(small, self.reference)
+            change = float(diff.mean())
+            # With no faces known, motion anywhere may be someone walking in
+            motion = self._roi_motion(diff, boxes, step) if len(boxes) else change
+            if change >= self.scene_threshold:
+                reason = "scene"
+            elif not due:
+                return False
+            elif motion >= self.motion_threshold:
+                reason = "motion"
+            elif now - self.last_run >= self.max_skip:
+                reason = "refresh"
+            else:
+                reason = None
+
+        self.last_tick = now
+        if reason is None:
+            self.counts["skipped"] += 1
+            return False
+        self.counts[reason] += 1
+        self.reference = small
+        self.last_run = now
+        return True
+
+    def stats(self, metrics=None):
+        """Tick counts, skip ratio and, given the pipeline's StageMetrics, estimated inference time saved."""
+        skipped = self.counts["skipped"]
+        ticks = sum(self.counts.values())
+        stats = {**self.counts, "skip_ratio": skipped / ticks if ticks else 0.0}
+        if metrics is not None:
+            snapshot = metrics.snapshot()["stages"]
+            runs = snapshot.get("detect", {}).get("count", 0)
+            cost = sum(snapshot[stage]["mean_ms"] * snapshot[stage]["count"]
+                       for stage in INFERENCE_STAGES if stage in snapshot)
+            gate = snapshot.get("gate", {})
+            stats["inference_ms"] = cost / runs if runs else 0.0
+            stats["saved_s"] = skipped * stats["inference_ms"] / 1000
+            stats["gate_cost_s"] = gate.get("mean_ms", 0.0) * gate.get("count", 0) / 1000
+        return stats
+
+    def report(self, metrics=None):
+        stats = self.stats(metrics)
+        line = (f"[GATE] {stats['skipped']} of {sum(self.counts.values())} ticks skipped "
+                f"({stats['skip_ratio']:.0%}); runs: scene {stats['scene']}, motion {stats['motion']}, "
+                f"refresh {stats['refresh']}")
+        if "saved_s" in stats:
+            line += (f"; ~{stats['saved_s']:.1f}s inference saved for "
+                     f"{stats['gate_cost_s']:.2f}s of gating")
+        print(line)
+        return stats
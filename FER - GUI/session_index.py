@@ -0,0 +1,331 @@
+"""session_index.py
+--------------------------------
+Local SQLite index over every ``logs/session_*`` raw emotion log.
+
+Each session is ingested once (and incrementally when its log has grown)
+into per-second and per-minute rollup tables holding the row count for
+every (time bucket, session, person, emotion).  Distribution and timeline
+queries over any time range then read a few thousand pre-aggregated rows
+instead of every CSV: whole minutes come from the minute table and only
+the partial minutes at the edges of the range from the second table.
+Rollups outlive the raw logs, so history survives log retention.
+
+The live loggers ingest their session when they stop; the CLI can
+(re)index the whole tree and chart any range.
+
+```bash
+python session_index.py --ingest
+python session_index.py --since 7d --plot week
+python session_index.py --start "2025-06-22 21:00" --end "2025-06-22 23:00" --bucket 60
+```
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from log_retention import LOGS_DIR, capture_times, log_segments, strip_log_suffix
+
+INDEX_NAME = "index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    first_ts INTEGER,
+    last_ts INTEGER,
+    rows INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS segments (
+    key TEXT PRIMARY KEY,
+    session_id INTEGER NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollup_second (
+    ts INTEGER NOT NULL,
+    session_id INTEGER NOT NULL,
+    track TEXT NOT NULL,
+    emotion TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (ts, session_id, track, emotion)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_minute (
+    ts INTEGER NOT NULL,
+    session_id INTEGER NOT NULL,
+    track TEXT NOT NULL,
+    emotion TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (ts, session_id, track, emotion)
+) WITHOUT ROWID;
+"""
+
+UPSERT = ("INSERT INTO {table} (ts, session_id, track, emotion, count) VALUES (?, ?, ?, ?, ?) "
+          "ON CONFLICT (ts, session_id, track, emotion) DO UPDATE SET count = count + excluded.count")
+
+# Ingestion from several logger threads is serialised per process
+_write_lock = threading.Lock()
+
+
+def to_epoch(value):
+    """Log timestamps are naive local wall-clock times; they are stored as seconds on that clock."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(pd.Timestamp(value).value // 1_000_000_000)
+
+
+def from_epoch(seconds):
+    return pd.to_datetime(seconds, unit="s")
+
+
+class SessionIndex:
+    """Sessions and per-second / per-minute emotion rollups in logs/index.sqlite."""
+
+    def __init__(self, logs_dir=LOGS_DIR, path=None):
+        self.logs_dir = logs_dir
+        self.path = path or os.path.join(logs_dir, INDEX_NAME)
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    # -- ingestion ----------------------------------------------------------
+
+    def _raw_logs(self, session_dir):
+        names = {strip_log_suffix(entry).split(".")[0] for entry in os.listdir(session_dir)
+                 if entry.startswith("raw_emotion_log_")}
+        return [os.path.join(session_dir, name + ".csv") for name in sorted(names)]
+
+    def ingest_session(self, session_dir, conn=None):
+        """Add rows not yet indexed from the session's raw log segments; returns rows added."""
+        own = conn is None
+        conn = conn or self.connect()
+        name = os.path.basename(os.path.normpath(session_dir))
+        added = 0
+        try:
+            with _write_lock, conn:
+                conn.execute("INSERT OR IGNORE INTO sessions (name) VALUES (?)", (name,))
+                session_id = conn.execute("SELECT id FROM sessions WHERE name = ?", (name,)).fetchone()[0]
+                for raw_log in self._raw_logs(session_dir):
+                    for segment in log_segments(raw_log):
+                        added += self._ingest_segment(conn, session_id, segment)
+                if added:
+                    conn.execute(
+                        "UPDATE sessions SET rows = rows + ?, "
+                        "first_ts = (SELECT MIN(ts) FROM rollup_second WHERE session_id = ?), "
+                        "last_ts = (SELECT MAX(ts) FROM rollup_second WHERE session_id = ?) WHERE id = ?",
+                        (added, session_id, session_id, session_id))
+        finally:
+            if own:
+                conn.close()
+        return added
+
+    def _ingest_segment(self, conn, session_id, segment):
+        # Keyed without the compression suffix, so compressing a segment does not re-ingest it
+        key = os.path.relpath(strip_log_suffix(segment), self.logs_dir)
+        row = conn.execute("SELECT rows FROM segments WHERE key = ?", (key,)).fetchone()
+        done = row[0] if row else 0
+        df = pd.read_csv(segment, compression="infer", skiprows=range(1, done + 1))
+        if df.empty:
+            return 0
+
+        if "capture_ns" in df.columns:
+            times = pd.Series(capture_times(df["capture_ns"], os.path.dirname(segment)), index=df.index)
+        else:
+            times = pd.to_datetime(df["timestamp"])
+        df["ts"] = (times - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+        df["track"] = df["person_id"].astype(str)
+        seconds = df.groupby(["ts", "track", "dominant_emotion"]).size().reset_index(name="count")
+        seconds["session_id"] = session_id
+        minutes = seconds.assign(ts=seconds["ts"] // 60 * 60) \
+            .groupby(["ts", "session_id", "track", "dominant_emotion"])["count"].sum().reset_index()
+        columns = ["ts", "session_id", "track", "dominant_emotion", "count"]
+        conn.executemany(UPSERT.format(table="rollup_second"),
+                         seconds[columns].itertuples(index=False, name=None))
+        conn.executemany(UPSERT.format(table="rollup_minute"),
+                         minutes[columns].itertuples(index=False, name=None))
+        conn.execute("INSERT INTO segments (key, session_id, rows) VALUES (?, ?, ?) "
+                     "ON CONFLICT (key) DO UPDATE SET rows = excluded.rows",
+                     (key, session_id, done + len(df)))
+        return len(df)
+
+    def ingest_all(self):
+        """Index every session under logs/; returns (sessions touched, rows added)."""
+        sessions = sorted(entry for entry in os.listdir(self.logs_dir)
+                          if entry.startswith("session_")) if os.path.isdir(self.logs_dir) else []
+        touched = added = 0
+        conn = self.connect()
+        try:
+            for entry in sessions:
+                rows = self.ingest_session(os.path.join(self.logs_dir, entry), conn)
+                touched += rows > 0
+                added += rows
+        finally:
+            conn.close()
+        print(f"[INDEX] {added} new rows from {touched} of {len(sessions)} session(s) -> {self.path}")
+        return touched, added
+
+    def ingest_async(self, session_dir):
+        def run():
+            try:
+                self.ingest_session(session_dir)
+            except Exception as e:
+                print(f"[INDEX] Could not index {session_dir}: {e}")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    # -- queries ------------------------------------------------------------
+
+    def _ranges(self, start, end):
+        """(table, lo, hi) pieces covering [start, end): whole minutes from rollup_minute, edges from rollup_second."""
+        if start is None or end is None:
+            return [("rollup_minute", start, end)]
+        inner_lo = -(-start // 60) * 60
+        inner_hi = end // 60 * 60
+        if inner_lo >= inner_hi:
+            return [("rollup_second", start, end)]
+        pieces = [("rollup_minute", inner_lo, inner_hi)]
+        if start < inner_lo:
+            pieces.append(("rollup_second", start, inner_lo))
+        if inner_hi < end:
+            pieces.append(("rollup_second", inner_hi, end))
+        return pieces
+
+    @staticmethod
+    def _where(lo, hi, track):
+        clauses, params = [], []
+        if lo is not None:
+            clauses.append("ts >= ?")
+            params.append(lo)
+        if hi is not None:
+            clauses.append("ts < ?")
+            params.append(hi)
+        if track is not None:
+            clauses.append("track = ?")
+            params.append(track)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def distribution(self, start=None, end=None, track=None):
+        """Rows per emotion in [start, end) across all sessions, as a Series."""
+        start, end = to_epoch(start), to_epoch(end)
+        totals = {}
+        with closing(self.connect()) as conn:
+            for table, lo, hi in self._ranges(start, end):
+                where, params = self._where(lo, hi, track)
+                for emotion, count in conn.execute(
+                        f"SELECT emotion, SUM(count) FROM {table}{where} GROUP BY emotion", params):
+                    totals[emotion] = totals.get(emotion, 0) + count
+        return pd.Series(totals, dtype="int64").sort_values(ascending=False)
+
+    def timeline(self, start=None, end=None, bucket=60, track=None):
+        """Rows per (bucket start, emotion) in [start, end), as a bucket x emotion DataFrame."""
+        start, end = to_epoch(start), to_epoch(end)
+        bucket = max(1, int(bucket))
+        pieces = self._ranges(start, end) if bucket % 60 == 0 else [("rollup_second", start, end)]
+        frames = []
+        with closing(self.connect()) as conn:
+            for table, lo, hi in pieces:
+                where, params = self._where(lo, hi, track)
+                frames.append(pd.read_sql_query(
+                    f"SELECT (ts / {bucket}) * {bucket} AS bucket, emotion, SUM(count) AS count "
+                    f"FROM {table}{where} GROUP BY bucket, emotion", conn, params=params))
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["bucket", "emotion", "count"])
+        if df.empty:
+            return pd.DataFrame()
+        table = df.pivot_table(index="bucket", columns="emotion", values="count", aggfunc="sum", fill_value=0)
+        table.index = from_epoch(table.index)
+        return table
+
+    def sessions(self):
+        with closing(self.connect()) as conn:
+            df = pd.read_sql_query("SELECT name, first_ts, last_ts, rows FROM sessions ORDER BY first_ts", conn)
+        for column in ("first_ts", "last_ts"):
+            df[column] = from_epoch(df[column])
+        return df
+
+
+def plot_range(index, output_prefix, start=None, end=None, bucket=None):
+    """Distribution bar chart and stacked timeline for a time range; returns the two image paths."""
+    start, end = to_epoch(start), to_epoch(end)
+    distribution = index.distribution(start, end)
+    if bucket is None:
+        # About 200 buckets over the range, in whole minutes so the minute rollups serve them
+        span = end - start if start is not None and end is not None else 86400
+        bucket = max(60, span // 200 // 60 * 60)
+    timeline = index.timeline(start, end, bucket)
+
+    dist_path, time_path = f"{output_prefix}_distribution.png", f"{output_prefix}_timeline.png"
+    plt.figure(figsize=(8, 5))
+    distribution.sort_values().plot(kind="barh", color="skyblue")
+    plt.title("Emotion Distribution")
+    plt.xlabel("Count")
+    plt.ylabel("Emotion")
+    plt.grid(axis="x", linestyle="--", alpha=0.7)
+    plt.tight_layout()
+    plt.savefig(dist_path)
+    plt.close()
+
+    plt.figure(figsize=(12, 5))
+    if not timeline.empty:
+        shares = timeline.div(timeline.sum(axis=1), axis=0)
+        plt.stackplot(shares.index, shares.T.values, labels=shares.columns)
+        plt.legend(loc="upper left", bbox_to_anchor=(1.0, 1.0))
+    plt.title(f"Emotion Share per {bucket}s")
+    plt.xlabel("Time")
+    plt.ylabel("Share")
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    plt.savefig(time_path)
+    plt.close()
+    print(f"[INDEX] Charts saved: {dist_path}, {time_path}")
+    return dist_path, time_path
+
+
+def _parse_since(value):
+    units = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+    return datetime.now() - timedelta(seconds=float(value[:-1]) * units[value[-1]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index emotion logs and query them by time range")
+    parser.add_argument("--logs", type=str, default=LOGS_DIR, help="Logs directory")
+    parser.add_argument("--ingest", action="store_true", help="Index new rows of every session first")
+    parser.add_argument("--since", type=str, default=None, help="Range start relative to now, e.g. 90m, 12h, 7d")
+    parser.add_argument("--start", type=str, default=None, help="Range start, e.g. '2025-06-22 21:00'")
+    parser.add_argument("--end", type=str, default=None, help="Range end (default: now)")
+    parser.add_argument("--bucket", type=int, default=None, help="Timeline bucket in seconds")
+    parser.add_argument("--plot", type=str, default=None, help="Write <PLOT>_distribution.png and <PLOT>_timeline.png")
+    args = parser.parse_args()
+
+    index = SessionIndex(args.logs)
+    if args.ingest:
+        index.ingest_all()
+
+    start = _parse_since(args.since) if args.since else args.start
+    end = args.end or (datetime.now() if start is not None else None)
+    started = time.perf_counter()
+    distribution = index.distribution(start, end)
+    elapsed = (time.perf_counter() - started) * 1000
+    total = int(distribution.sum())
+    print(f"[INDEX] {total} rows between {start or 'the beginning'} and {end or 'now'} ({elapsed:.1f} ms)")
+    for emotion, count in distribution.items():
+        print(f"  {emotion:<10} {count:>9}  {count / total:6.1%}")
+    if args.plot:
+        plot_range(index, args.plot, start, end, args.bucket)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ import os
 import tkinter as tk
 from tkinter import ttk
 import tkinter.messagebox as messagebox
-import shutil
+from log_retention import clear_logs_async
 
 CONFIG_FILE = "config.json"
 
@@ -19,7 +19,29 @@ default_config = {
     "mirror_toggle": False,
     "fps_toggle": False,
     "logging_toggle": True,
-    "overlay_location": 1
+    "metrics_hud_toggle": False,
+    "record_toggle": False,
+    "overlay_location": 1,
+    "metrics_port": 9108,
+    "frame_source": 0,
+    "source_realtime": True,
+    "inference_service": "",
+    "emotion_backend": "fer",
+    "smoothing": {"method": "ema", "alpha": 0.6, "window": 5, "stay": 0.9, "track": True},
+    "scene_gate": {"enabled": True, "motion_threshold": 6.0, "scene_threshold": 30.0, "max_skip": 2.0},
+    "roi_search": {"enabled": True, "margin": 0.5, "sweep_interval": 2.0},
+    "record_codec": "XVID",
+    "record_fps": 0,
+    "record_width": 0,
+    "record_height": 0,
+    "log_retention": {"max_total_mb": 1024, "max_age_days": 0, "segment_rows": 100000, "compression": "gzip"},
+    "negotiate_capture": False,
+    "preview": {"max_width": 960, "max_height": 540, "fps": 15, "threaded": True},
+    "preprocess_chain": [
+        {"op": "resize", "width": 640, "height": 480},
+        {"op": "clahe", "clip_limit": 2.0, "tile_grid": 8},
+        {"op": "blur", "ksize": 5, "sigma": 0.8}
+    ]
 }
 
 display_names = {
@@ -34,6 +56,8 @@ display_names = {
     "mirror_toggle": "Mirror Video",
     "fps_toggle": "FPS Display",
     "logging_toggle": "Session Logging",
+    "metrics_hud_toggle": "Latency HUD",
+    "record_toggle": "Record Session Video",
     "overlay_location": "Overlay Location"
 }
 
@@ -52,7 +76,8 @@ def save_config(data):
     with open(CONFIG_FILE, 'w') as f:
         json.dump(data, f, indent=4)
 
-def edit_settings(parent):
+def edit_settings(parent, on_save=None):
+    """on_save(config) is called after saving, e.g. to push the settings to a running pipeline."""
     config = load_config()
 
     window = tk.Toplevel(parent)
@@ -89,6 +114,8 @@ def edit_settings(parent):
         "mirror_toggle", 
         "fps_toggle", 
         "logging_toggle", 
+        "metrics_hud_toggle",
+        "record_toggle",
     ]
     for i, key in enumerate(toggle_keys):
         var = tk.BooleanVar(value=config.get(key, default_config[key]))
@@ -147,6 +174,8 @@ def edit_settings(parent):
         config["overlay_location"] = location_options[overlay_var.get()]
         save_config(config)
         print("Config updated.")
+        if on_save is not None:
+            on_save(config)
         window.destroy()
 
     tk.Button(window, 
@@ -167,13 +196,9 @@ def clear_logs():
     if not messagebox.askyesno("Confirm Clear Logs", "Are you sure you want to delete all logs?"):
         return
 
+    # Sessions are moved aside instantly and deleted on a worker thread, so the UI never blocks
     try:
-        for entry in os.listdir(logs_dir):
-            path = os.path.join(logs_dir, entry)
-            if os.path.isdir(path):
-                shutil.rmtree(path)
-            else:
-                os.remove(path)
-        messagebox.showinfo("Clear Logs", "All logs cleared successfully.")
+        clear_logs_async(logs_dir, done=lambda count: print(f"[LOGS] Deleted {count} log entries"))
+        messagebox.showinfo("Clear Logs", "Logs are being deleted in the background.")
     except Exception as e:
         messagebox.showerror("Error", f"Failed to clear logs:\n{e}")
\ No newline at end of file
@@ -0,0 +1,98 @@
+import queue
+import threading
+import time
+
+import cv2
+
+
+class AsyncVideoWriter:
+    """cv2.VideoWriter that encodes on its own thread behind a bounded queue.
+
+    write() never waits for the encoder: when the queue is full the frame is
+    dropped and counted, so a slow codec cannot stall the capture loop.
+    block=True waits instead, for unpaced recorded input where every frame
+    should be kept.
+    size=None records at the size of the first frame; other frames are
+    resized to it.  Pass the source's fps so playback runs at real speed.
+    Frames are encoded later, so do not draw on a frame after writing it.
+    """
+
+    def __init__(self, path, fps=30.0, size=None, codec="XVID", queue_size=64, block=False):
+        self.path = path
+        self.fps = float(fps) if fps and fps > 0 else 30.0
+        self.size = tuple(size) if size else None
+        self.codec = codec
+        self.block = block
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.encode_time = 0.0
+        self.error = None
+        self._writer = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, frame):
+        """Queue a frame for encoding; returns False if it had to be dropped."""
+        if self.error is not None:
+            self.dropped += 1
+            return False
+        try:
+            self.queue.put(frame, block=self.block)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _open(self, frame):
+        if self.size is None:
+            self.size = (frame.shape[1], frame.shape[0])
+        writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.codec), self.fps, self.size)
+        if not writer.isOpened():
+            raise IOError(f"Cannot open video writer for {self.path} ({self.codec})")
+        return writer
+
+    def _run(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue
+            start = time.perf_counter()
+            try:
+                if self._writer is None:
+                    self._writer = self._open(frame)
+                if (frame.shape[1], frame.shape[0]) != self.size:
+                    frame = cv2.resize(frame, self.size)
+                self._writer.write(frame)
+                self.written += 1
+            except Exception as e:
+                self.error = e
+                print(f"[RECORD] Encoder stopped: {e}")
+            self.encode_time += time.perf_counter() - start
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self.queue.qsize(),
+            "encode_ms": self.encode_time / self.written * 1000 if self.written else 0.0,
+        }
+
+    def release(self):
+        """Encode what is still queued, then close the file."""
+        self.queue.put(None)
+        self._thread.join()
+        if self._writer is not None:
+            self._writer.release()
+        stats = self.stats()
+        print(f"[RECORD] {stats['path']}: {stats['written']} frames written, "
+              f"{stats['dropped']} dropped, {stats['encode_ms']:.1f} ms/frame encode")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
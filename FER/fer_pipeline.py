@@ -1,14 +1,19 @@
 import cv2
-import numpy as np
 from fer import FER
 import time
 import os
-from emoji_utils import overlay_emoji
-from camera_utils import get_webcam
+from face_results import FaceResults
+from face_search import RegionFaceSearch
+from frame_sources import open_source
 from visual_utils import draw_emotion_data, draw_status_text
+from smoothing import EmotionSmoother
 from csv_logger import EmotionCSVLogger
+from metrics_utils import StageMetrics, start_metrics_server, draw_metrics_hud
+from scene_gate import SceneGate
+from video_writer import AsyncVideoWriter
 
-def run_fer_loop():
+def run_fer_loop(metrics_port=9108, source=0, realtime=True, headless=False, negotiate=False,
+                 record=None, record_codec="XVID", smoothing="ema", scene_gate=True, roi_search=True):
     print("Loading FER emotion detector...")
     try:
         detector = FER(mtcnn=True)
@@ -34,70 +39,108 @@ def run_fer_loop():
     }
 
     try:
-        cap = get_webcam()
+        cap = open_source(source, realtime=realtime, width=640, height=360, fps=30,
+                          negotiate=negotiate)
     except IOError as e:
         print(e)
         return
 
     prev_time = time.time()
-    last_emotion_time = 0
     emotion_interval = 0.2  # seconds
-    emotion_history = {}
+    gate = SceneGate(interval=emotion_interval, enabled=scene_gate)
+    detector = RegionFaceSearch(detector, enabled=roi_search)
+    smoother = EmotionSmoother(method=smoothing)
     frame_count = 0
-    emotions_data = []  # persist between frames
+    results = FaceResults()  # persist between frames
+    smoothed = FaceResults()
     logging_active = False
     csv_logger = EmotionCSVLogger()
 
+    recorder = None
+    if record:
+        recorder = AsyncVideoWriter(record, fps=cap.fps, codec=record_codec, block=not cap.realtime)
+        print(f"Recording annotated video to {record}")
+
+    metrics = StageMetrics()
+    show_metrics = False
+    if metrics_port:
+        start_metrics_server(metrics, port=metrics_port)
+
     print("Starting FER emotion detection...")
-    print("Press 'r' to toggle logging, 'q' or ESC to quit.")
+    print("Press 'r' to toggle logging, 'm' to toggle latency HUD, 'q' or ESC to quit.")
 
     while True:
-        ret, frame = cap.read()
+        with metrics.time("capture"):
+            ret, frame = cap.read()
         if not ret:
-            print("Error reading frame")
+            print("Error reading frame" if cap.kind == "webcam" else "End of source")
             break
 
         frame_count += 1
-        curr_time = time.time()
-
-        # Detect emotion every N seconds
-        if curr_time - last_emotion_time >= emotion_interval:
+        now = time.time()
+        # Unpaced sources schedule detection on stream time, not wall time
+        curr_time = now if cap.realtime else cap.media_time()
+
+        # Detect emotion every N seconds, unless nothing in view has changed
+        with metrics.time("gate"):
+            run_inference = gate.check(frame, results.boxes, curr_time)
+        if run_inference:
             try:
-                emotions_data = detector.detect_emotions(frame)
-                last_emotion_time = curr_time
-
-                if emotions_data:
-                    dominant_emotion = emotions_data[0]['emotions']
-                    top_emotion = max(dominant_emotion, key=dominant_emotion.get)
+                with metrics.time("detect"):
+                    faces = detector.find_faces(frame, bgr=True, now=curr_time)
+                with metrics.time("classify"):
+                    results = FaceResults.from_fer(detector.detect_emotions(frame, face_rectangles=faces))
+                with metrics.time("smooth"):
+                    smoothed = smoother.smooth_results(results)
+
+                if results:
+                    top_emotion = results.top_labels()[0]
                     print(f"[{time.strftime('%H:%M:%S')}] Dominant Emotion: {top_emotion}")
 
                     if logging_active:
-                        csv_logger.log(person_id="Unknown", emotion=top_emotion)
+                        with metrics.time("log"):
+                            csv_logger.log(person_id="Unknown", emotion=top_emotion,
+                                           captured_ns=cap.captured_ns)
 
             except Exception as e:
                 print(f"Error in emotion detection: {e}")
 
-        # Always draw latest emotions (even if not updated this frame)
-        frame = draw_emotion_data(frame, emotions_data, emotion_history, emoji_paths)
+        with metrics.time("overlay"):
+            # Always draw latest emotions (even if not updated this frame)
+            frame = draw_emotion_data(frame, smoothed, None, emoji_paths, smooth=False)
+
+            # Show face count
+            cv2.putText(frame, f"Faces detected: {len(results)}", (10, 60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+            # Show logging status
+            if logging_active:
+                cv2.putText(frame, "LOGGING ACTIVE", (10, 90),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+            # FPS calculation
+            fps = 1 / (now - prev_time) if now != prev_time else 0
+            prev_time = now
+            draw_status_text(frame, fps, frame_count)
 
-        # Show face count
-        cv2.putText(frame, f"Faces detected: {len(emotions_data)}", (10, 60),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            if show_metrics:
+                draw_metrics_hud(frame, metrics)
 
-        # Show logging status
-        if logging_active:
-            cv2.putText(frame, "LOGGING ACTIVE", (10, 90),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        if recorder is not None:
+            with metrics.time("output"):
+                recorder.write(frame)
 
-        # FPS calculation
-        fps = 1 / (curr_time - prev_time) if curr_time != prev_time else 0
-        prev_time = curr_time
-        draw_status_text(frame, fps, frame_count)
+        key = -1
+        if not headless:
+            with metrics.time("output"):
+                cv2.imshow("FER Emotion Detection", frame)
+                key = cv2.waitKey(1) & 0xFF
+        metrics.frame_done()
 
-        cv2.imshow("FER Emotion Detection", frame)
-        key = cv2.waitKey(1) & 0xFF
         if key in [27, ord('q')]:
             break
+        elif key == ord('m'):
+            show_metrics = not show_metrics
         elif key == ord('r'):
             logging_active = not logging_active
             if logging_active:
@@ -109,5 +152,10 @@ def run_fer_loop():
 
     print("Shutting down...")
     cap.release()
-    cv2.destroyAllWindows()
+    if recorder is not None:
+        recorder.release()
+    if not headless:
+        cv2.destroyAllWindows()
+    gate.report(metrics)
+    detector.report()
     print("FER emotion detection ended.")
\ No newline at end of file
@@ -0,0 +1,219 @@
+import os
+import time
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+from camera_utils import get_capture_format, get_webcam
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FrameSource(ABC):
+    """cv2.VideoCapture-like frame source with optional real-time pacing.
+
+    Subclasses implement _grab(); width, height and fps describe what the
+    source actually delivers, not what was requested.  With realtime=False
+    frames are returned as fast as they can be produced.  count > 0 stops
+    the source after that many frames.  captured_ns is the time.monotonic_ns()
+    at which the last frame was read, for stamping results of that frame.
+    """
+
+    kind = "source"
+
+    def __init__(self, realtime=True, count=0):
+        self.realtime = realtime
+        self.count = count
+        self.width = 0
+        self.height = 0
+        self.fps = 0.0
+        self.frame_index = 0
+        self.captured_ns = 0
+        self._start = None
+
+    @abstractmethod
+    def _grab(self):
+        """Return (ok, frame) for the next frame, like cv2.VideoCapture.read()."""
+
+    def read(self):
+        if self.count and self.frame_index >= self.count:
+            return False, None
+        ret, frame = self._grab()
+        if not ret:
+            return False, None
+        self.captured_ns = time.monotonic_ns()
+        if self.realtime and self.fps > 0:
+            self._pace()
+        self.frame_index += 1
+        return True, frame
+
+    def _pace(self):
+        if self._start is None:
+            self._start = time.perf_counter()
+            return
+        delay = self._start + self.frame_index / self.fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def media_time(self):
+        """Seconds into the stream, for scheduling work on unpaced sources."""
+        return self.frame_index / self.fps if self.fps else 0.0
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+    def describe(self):
+        return {"kind": self.kind, "width": self.width, "height": self.height,
+                "fps": self.fps, "realtime": self.realtime}
+
+    def __iter__(self):
+        while True:
+            ret, frame = self.read()
+            if not ret:
+                return
+            yield frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class WebcamSource(FrameSource):
+    """Physical camera by index.  Devices pace themselves, so it is always real-time."""
+
+    kind = "webcam"
+
+    def __init__(self, index=0, width=1920, height=1080, fps=30, realtime=True, negotiate=False):
+        super().__init__(realtime=True)
+        self.index = index
+        self.cap = get_webcam(fps=fps, width=width, height=height, index=index, negotiate=negotiate)
+        actual = get_capture_format(self.cap)
+        self.width, self.height = actual["width"], actual["height"]
+        self.fps = actual["fps"] or float(fps)
+        self.fourcc = actual["fourcc"]
+
+    def _grab(self):
+        return self.cap.read()
+
+    def _pace(self):
+        pass
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    kind = "video"
+
+    def __init__(self, path, realtime=True, loop=False, count=0):
+        super().__init__(realtime=realtime, count=count)
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"ERROR: Cannot open video file: {path}")
+        actual = get_capture_format(self.cap)
+        self.width, self.height = actual["width"], actual["height"]
+        self.fps = actual["fps"] or 30.0
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def _grab(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageFolderSource(FrameSource):
+    kind = "images"
+
+    def __init__(self, folder, fps=30.0, realtime=True, loop=False, count=0):
+        super().__init__(realtime=realtime, count=count)
+        self.paths = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.paths:
+            raise IOError(f"ERROR: No images found in {folder}")
+        self.loop = loop
+        self.fps = float(fps)
+        self._pos = 0
+        first = cv2.imread(self.paths[0])
+        if first is None:
+            raise IOError(f"ERROR: Cannot read image: {self.paths[0]}")
+        self.height, self.width = first.shape[:2]
+
+    def _grab(self):
+        if self._pos >= len(self.paths):
+            if not self.loop:
+                return False, None
+            self._pos = 0
+        frame = cv2.imread(self.paths[self._pos])
+        self._pos += 1
+        if frame is None:
+            return False, None
+        if frame.shape[:2] != (self.height, self.width):
+            frame = cv2.resize(frame, (self.width, self.height))
+        return True, frame
+
+
+class SyntheticSource(FrameSource):
+    """Deterministic noise background with a face-like blob drifting across it."""
+
+    kind = "synthetic"
+
+    def __init__(self, width=1280, height=720, fps=30.0, count=0, seed=0, realtime=True):
+        super().__init__(realtime=realtime, count=count)
+        self.width, self.height, self.fps = width, height, float(fps)
+        rng = np.random.default_rng(seed)
+        background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        self.background = cv2.GaussianBlur(background, (0, 0), sigmaX=8)
+        self.radius = max(8, height // 6)
+
+    def _grab(self):
+        frame = self.background.copy()
+        travel = max(1, self.width - 2 * self.radius)
+        cx = self.radius + (self.frame_index * 4) % travel
+        cv2.ellipse(frame, (cx, self.height // 2), (self.radius, int(self.radius * 1.3)),
+                    0, 0, 360, (140, 170, 210), -1)
+        return True, frame
+
+
+def open_source(spec=0, realtime=True, width=1920, height=1080, fps=30, loop=False, count=0,
+                negotiate=False):
+    """Open a frame source from a spec.
+
+    spec may be a webcam index (int or digit string), a video file, a folder
+    of images, or "synthetic" / "synthetic:WIDTHxHEIGHT".  negotiate=True
+    probes (or loads the cached) best webcam capture mode first.
+    """
+    spec = str(spec)
+    if spec.isdigit():
+        source = WebcamSource(int(spec), width=width, height=height, fps=fps, negotiate=negotiate)
+    elif spec.startswith("synthetic"):
+        if ":" in spec:
+            width, height = (int(v) for v in spec.split(":", 1)[1].lower().split("x"))
+        source = SyntheticSource(width=width, height=height, fps=fps, count=count, realtime=realtime)
+    elif os.path.isdir(spec):
+        source = ImageFolderSource(spec, fps=fps, realtime=realtime, loop=loop, count=count)
+    else:
+        source = VideoFileSource(spec, realtime=realtime, loop=loop, count=count)
+
+    info = source.describe()
+    print(f"[SOURCE] {info['kind']} {info['width']}x{info['height']} @ {info['fps']:g} fps"
+          f"{'' if info['realtime'] else ' (unpaced)'}")
+    return source
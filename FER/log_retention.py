@@ -0,0 +1,339 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOGS_DIR = "logs"
+# Per-session clock anchor pairing time.monotonic_ns() with local wall-clock time
+SESSION_META = "session.json"
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+# Sessions written to more recently than this may belong to another running pipeline
+IDLE_SECONDS = 300
+# Marker an active logger keeps in its session directory, so other processes can see it
+ACTIVE_MARKER = ".active"
+# A marker in a session untouched for this long was left behind by a crashed pipeline
+STALE_MARKER_SECONDS = 86400
+
+# Session directories with a logger writing to them in this process
+_active_sessions = set()
+_lock = threading.Lock()
+# One retention pass at a time, however many loggers trigger one
+_maintenance = threading.Lock()
+
+
+def strip_log_suffix(path):
+    """'x.csv.gz' / 'x.csv.zst' / 'x.csv' -> 'x'"""
+    for suffix in COMPRESSED_SUFFIXES.values():
+        if path.endswith(suffix):
+            path = path[:-len(suffix)]
+    return path[:-4] if path.endswith(".csv") else path
+
+
+def segment_path(raw_csv_path, index):
+    """Segment 0 is the raw log itself; later ones are raw_emotion_log_<ts>.001.csv, ..."""
+    return raw_csv_path if index == 0 else f"{strip_log_suffix(raw_csv_path)}.{index:03d}.csv"
+
+
+def open_segment(path):
+    """Binary file object over a segment's CSV bytes; .gz and .zst segments are decompressed."""
+    if path.endswith(COMPRESSED_SUFFIXES["gzip"]):
+        return gzip.open(path, "rb")
+    if path.endswith(COMPRESSED_SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def log_segments(path):
+    """Existing files holding the log at path, in order, whether compressed or not."""
+    base = strip_log_suffix(path)
+    directory = os.path.dirname(base) or "."
+    name = os.path.basename(base)
+    pattern = re.compile(re.escape(name) + r"(?:\.(\d{3}))?\.csv(?:\.gz|\.zst)?$")
+    segments = []
+    for entry in os.listdir(directory) if os.path.isdir(directory) else []:
+        match = pattern.match(entry)
+        if match:
+            segments.append((int(match.group(1) or 0), os.path.join(directory, entry)))
+    return [path for _, path in sorted(segments)]
+
+
+def write_clock_anchor(session_dir, wall_clock=None, monotonic_ns=None):
+    """Record one (wall clock, monotonic ns) pair for a session; returns it.
+
+    Defaults to now; offline sources pass the wall-clock time of their own
+    time origin instead.
+    """
+    wall_clock = datetime.now() if wall_clock is None else wall_clock
+    monotonic_ns = time.monotonic_ns() if monotonic_ns is None else int(monotonic_ns)
+    anchor = {"wall_clock": wall_clock.isoformat(), "monotonic_ns": monotonic_ns}
+    with open(os.path.join(session_dir, SESSION_META), "w") as f:
+        json.dump(anchor, f)
+    return anchor
+
+
+def capture_times(capture_ns, session_dir):
+    """Monotonic capture_ns values -> naive local datetimes, through the session's clock anchor."""
+    with open(os.path.join(session_dir, SESSION_META)) as f:
+        anchor = json.load(f)
+    offsets = np.asarray(capture_ns, dtype=np.int64) - anchor["monotonic_ns"]
+    return pd.Timestamp(anchor["wall_clock"]) + pd.to_timedelta(offsets, unit="ns")
+
+
+def read_log(path):
+    """One DataFrame from every segment of a log; .gz and .zst segments are decompressed on the fly.
+
+    Logs stamped with capture_ns (monotonic nanoseconds) are ordered by capture
+    time and get a datetime "timestamp" column; older logs keep their strings.
+    """
+    segments = log_segments(path)
+    if not segments:
+        raise FileNotFoundError(path)
+    frames = [pd.read_csv(segment, compression="infer") for segment in segments]
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    if "capture_ns" in df.columns:
+        df = df.sort_values("capture_ns", kind="stable", ignore_index=True)
+        df.insert(0, "timestamp", capture_times(df["capture_ns"], os.path.dirname(path) or "."))
+    return df
+
+
+def compress_file(path, method="gzip"):
+    """Compress path next to itself and remove the original; returns the new path."""
+    if method == "zstd" and zstandard is None:
+        method = "gzip"
+    target = path + COMPRESSED_SUFFIXES[method]
+    partial = target + ".part"
+    with open(path, "rb") as src:
+        if method == "zstd":
+            with open(partial, "wb") as dst:
+                zstandard.ZstdCompressor(level=10).copy_stream(src, dst)
+        else:
+            with gzip.open(partial, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+    os.replace(partial, target)
+    os.remove(path)
+    return target
+
+
+def register_session(session_dir):
+    with _lock:
+        _active_sessions.add(os.path.abspath(session_dir))
+    with open(os.path.join(session_dir, ACTIVE_MARKER), "w") as f:
+        json.dump({"pid": os.getpid(), "started": datetime.now().isoformat()}, f)
+
+
+def release_session(session_dir):
+    with _lock:
+        _active_sessions.discard(os.path.abspath(session_dir))
+    try:
+        os.remove(os.path.join(session_dir, ACTIVE_MARKER))
+    except FileNotFoundError:
+        pass
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _last_write(path):
+    times = [os.path.getmtime(path)]
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                times.append(os.path.getmtime(os.path.join(root, name)))
+            except OSError:
+                # Replaced by compression while we looked
+                pass
+    return max(times)
+
+
+def session_in_use(session_dir, active=None, now=None, idle_seconds=IDLE_SECONDS):
+    """True if a logger in this or another process may still be writing to session_dir.
+
+    A session counts as in use when this process registered it, when it holds
+    another process's ACTIVE_MARKER (unless the session has been untouched
+    for STALE_MARKER_SECONDS), or when it was written to within idle_seconds.
+    """
+    if active is None:
+        with _lock:
+            active = set(_active_sessions)
+    if os.path.abspath(session_dir) in active:
+        return True
+    now = time.time() if now is None else now
+    idle = now - _last_write(session_dir)
+    if os.path.exists(os.path.join(session_dir, ACTIVE_MARKER)) and idle < STALE_MARKER_SECONDS:
+        return True
+    return idle < idle_seconds
+
+
+class LogRetention:
+    """Size- and age-based retention for logs/session_* plus compression of closed sessions.
+
+    * Sessions older than ``max_age_days`` are deleted (0 keeps them forever).
+    * The oldest sessions are then deleted until logs/ fits in ``max_total_mb``.
+    * Raw logs of closed sessions are compressed (``compression``: gzip, zstd or none);
+      smoothed CSVs and charts are small and stay as written.
+    * ``segment_rows`` is the row limit of one raw log segment; EmotionCSVLogger
+      rotates to a new file and compresses the closed one when it is reached.
+
+    Sessions that are being logged to, in this process or recently by
+    another one, are never touched.  All work can run on a background thread.
+    """
+
+    def __init__(self, logs_dir=LOGS_DIR, max_total_mb=1024, max_age_days=0,
+                 segment_rows=100000, compression="gzip"):
+        if compression not in ("none", *COMPRESSED_SUFFIXES):
+            raise ValueError(f"Unknown compression '{compression}'. Choose from: none, gzip, zstd")
+        self.logs_dir = logs_dir
+        self.max_total_mb = max_total_mb
+        self.max_age_days = max_age_days
+        self.segment_rows = segment_rows
+        self.compression = compression
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Build from the "log_retention" block of config.json."""
+        config = dict(config or {})
+        return cls(max_total_mb=config.get("max_total_mb", 1024),
+                   max_age_days=config.get("max_age_days", 0),
+                   segment_rows=config.get("segment_rows", 100000),
+                   compression=config.get("compression", "gzip"))
+
+    def _sessions(self):
+        if not os.path.isdir(self.logs_dir):
+            return []
+        sessions = [os.path.join(self.logs_dir, entry) for entry in os.listdir(self.logs_dir)
+                    if entry.startswith("session_") and os.path.isdir(os.path.join(self.logs_dir, entry))]
+        return sorted(sessions, key=os.path.getmtime)
+
+    def compress_session(self, session_dir):
+        if self.compression == "none":
+            return 0
+        count = 0
+        for entry in sorted(os.listdir(session_dir)):
+            if entry.startswith("raw_emotion_log_") and entry.endswith(".csv"):
+                compress_file(os.path.join(session_dir, entry), self.compression)
+                count += 1
+        return count
+
+    def enforce(self):
+        """Apply the policy once; returns {"deleted": n, "compressed": n, "freed_mb": x}."""
+        with _maintenance:
+            return self._enforce()
+
+    def _enforce(self):
+        now = time.time()
+        deleted = compressed = freed = 0
+        with _lock:
+            active = set(_active_sessions)
+        sessions = [(path, session_in_use(path, active, now)) for path in self._sessions()]
+        sizes = {path: _dir_size(path) for path, _ in sessions}
+        total = sum(sizes.values())
+        max_age = self.max_age_days * 86400
+
+        for path, in_use in sessions:
+            too_old = max_age and now - os.path.getmtime(path) > max_age
+            too_big = self.max_total_mb and total > self.max_total_mb * 1024 * 1024
+            if in_use or not (too_old or too_big):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            deleted += 1
+            freed += sizes[path]
+            total -= sizes[path]
+
+        for path, in_use in sessions:
+            if not in_use and os.path.isdir(path):
+                compressed += self.compress_session(path)
+
+        if deleted or compressed:
+            print(f"[LOGS] Retention: deleted {deleted} session(s) ({freed / 1e6:.1f} MB), "
+                  f"compressed {compressed} file(s)")
+        return {"deleted": deleted, "compressed": compressed, "freed_mb": freed / 1e6}
+
+    def enforce_async(self, closed_session=None):
+        """enforce() on a background thread, first compressing a session that was just closed."""
+        def run():
+            if closed_session and os.path.isdir(closed_session):
+                with _maintenance:
+                    self.compress_session(closed_session)
+            self.enforce()
+
+        thread = threading.Thread(target=self._safe, args=(run,), daemon=True)
+        thread.start()
+        return thread
+
+    def compress_async(self, path):
+        """Compress one closed log segment in the background."""
+        if self.compression == "none":
+            return None
+        thread = threading.Thread(target=self._safe, args=(compress_file, path, self.compression),
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _safe(func, *args):
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"[LOGS] Background log maintenance failed: {e}")
+
+
+def clear_logs_async(logs_dir=LOGS_DIR, done=None):
+    """Delete every session except active ones on a background thread.
+
+    A session is active while a logger in any process holds it (see
+    session_in_use); closed sessions go however recently they were written.
+    The rest are first renamed into a trash directory, which is instant, so
+    callers on the UI thread return immediately.  done(count) runs on the
+    worker thread when deletion has finished.
+    """
+    trash = os.path.join(logs_dir, f".trash_{int(time.time() * 1000)}")
+    moved = kept = 0
+    now = time.time()
+    with _lock:
+        for entry in os.listdir(logs_dir) if os.path.isdir(logs_dir) else []:
+            path = os.path.join(logs_dir, entry)
+            if entry.startswith(".trash_"):
+                continue
+            if (entry.startswith("session_") and os.path.isdir(path)
+                    and session_in_use(path, _active_sessions, now, idle_seconds=0)):
+                kept += 1
+                continue
+            os.makedirs(trash, exist_ok=True)
+            os.replace(path, os.path.join(trash, entry))
+            moved += 1
+    if kept:
+        print(f"[LOGS] Kept {kept} session(s) still being logged to")
+
+    def worker():
+        # Also finish trash left behind by an interrupted earlier clear
+        for entry in os.listdir(logs_dir) if os.path.isdir(logs_dir) else []:
+            if entry.startswith(".trash_"):
+                shutil.rmtree(os.path.join(logs_dir, entry), ignore_errors=True)
+        if done is not None:
+            done(moved)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
@@ -1,4 +1,26 @@
+import argparse
 from fer_pipeline import run_fer_loop
 
 if __name__ == "__main__":
-    run_fer_loop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="FER emotion detection")
+    parser.add_argument("--source", default="0",
+                        help="Webcam index, video file, image folder or 'synthetic[:WxH]'")
+    parser.add_argument("--fast", action="store_true",
+                        help="Process recorded sources as fast as possible instead of in real time")
+    parser.add_argument("--headless", action="store_true", help="Do not open a preview window")
+    parser.add_argument("--negotiate", action="store_true",
+                        help="Probe webcam capture modes once and reuse the best (cached)")
+    parser.add_argument("--record", type=str, default=None,
+                        help="Save the annotated video to this file")
+    parser.add_argument("--record-codec", type=str, default="XVID", help="FOURCC for --record")
+    parser.add_argument("--smoothing", choices=["ema", "median", "hmm", "none"], default="ema",
+                        help="Temporal smoothing of emotion scores")
+    parser.add_argument("--no-gate", action="store_true",
+                        help="Run detection on every polling tick, even on static frames")
+    parser.add_argument("--full-search", action="store_true",
+                        help="Search the whole frame for faces every time instead of around the last ones")
+    args = parser.parse_args()
+    run_fer_loop(source=args.source, realtime=not args.fast, headless=args.headless,
+                 negotiate=args.negotiate, record=args.record, record_codec=args.record_codec,
+                 smoothing=args.smoothing, scene_gate=not args.no_gate,
+                 roi_search=not args.full_search)
\ No newline at end of file
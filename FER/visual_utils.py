@@ -1,4 +1,7 @@
 import cv2
+import numpy as np
+from face_results import EMOTION_LABELS, FaceResults
+from smoothing import EmotionSmoother
 
 emotion_colors = {
     "angry": (0, 0, 255),
@@ -10,26 +13,36 @@ emotion_colors = {
     "neutral": (128, 128, 128)
 }
 
-def draw_emotion_data(frame, emotions_data, emotion_history, emoji_paths):
+def _history_smoother(emotion_history, alpha=0.6):
+    smoother = emotion_history.get("smoother")
+    if smoother is None:
+        smoother = emotion_history["smoother"] = EmotionSmoother("ema", alpha=alpha)
+    return smoother
+
+def smooth_emotion_data(emotions_data, emotion_history, alpha=0.6):
+    """In-place EMA for callers keeping an emotion_history dict; pipelines use EmotionSmoother directly."""
+    smoother = _history_smoother(emotion_history, alpha)
+    for face_data, smoothed in zip(emotions_data, smoother.smooth(emotions_data)):
+        face_data["emotions"].update(smoothed["emotions"])
+    return emotions_data
+
+def draw_emotion_data(frame, emotions_data, emotion_history, emoji_paths, smooth=True):
+    """Draw boxes, emojis and score bars for a FaceResults (FER-style lists are converted first)."""
     from emoji_utils import overlay_emoji
-    for i, face_data in enumerate(emotions_data):
-        (x, y, w, h) = face_data["box"]
-        emotions = face_data["emotions"]
-        top_emotion = max(emotions, key=emotions.get)
+    results = FaceResults.from_fer(emotions_data)
+    if smooth and emotion_history is not None and results:
+        results = _history_smoother(emotion_history).smooth_results(results)
+
+    # Best-first emotion order per face, computed for all faces at once
+    order = np.argsort(-results.scores, axis=1, kind="stable")
 
-        face_id = f"face_{i}"
-        if face_id in emotion_history:
-            alpha = 0.6
-            for emotion in emotions:
-                if emotion in emotion_history[face_id]:
-                    emotions[emotion] = (alpha * emotions[emotion] +
-                                         (1 - alpha) * emotion_history[face_id][emotion])
-            top_emotion = max(emotions, key=emotions.get)
-        emotion_history[face_id] = emotions.copy()
+    for i, (box, scores) in enumerate(zip(results.boxes.tolist(), results.scores)):
+        (x, y, w, h) = box
+        top_emotion = EMOTION_LABELS[order[i, 0]]
 
         color = emotion_colors.get(top_emotion, (255, 255, 255))
         cv2.rectangle(frame, (x, y), (x + w, y + h), color, 3)
-        label = f"{top_emotion.upper()}: {emotions[top_emotion]:.2f}"
+        label = f"{top_emotion.upper()}: {scores[order[i, 0]]:.2f}"
         cv2.putText(frame, label, (x, y - 10),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
 
@@ -41,7 +54,7 @@ def draw_emotion_data(frame, emotions_data, emotion_history, emoji_paths):
         bar_y = y
         bar_width = 120
         bar_height = 15
-        sorted_emotions = sorted(emotions.items(), key=lambda item: item[1], reverse=True)
+        sorted_emotions = [(EMOTION_LABELS[k], float(scores[k])) for k in order[i]]
 
         for j, (emotion, score) in enumerate(sorted_emotions[:7]):
             bar_length = int(score * bar_width)
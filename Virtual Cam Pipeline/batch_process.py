@@ -0,0 +1,137 @@
+"""batch_process.py
+--------------------------------
+Reprocess every ``logs/session_*/raw_emotion_log_*.csv`` at once, e.g.
+after changing the smoothing window.  Logs are smoothed and plotted
+across a process pool; sessions whose smoothed CSV and charts were already
+produced from the current log with the same settings are skipped.  One
+row per log is written to a combined summary table.
+
+```bash
+python batch_process.py
+python batch_process.py --window-size 50 --workers 8
+python batch_process.py --force --summary logs/summary.csv
+```
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import pandas as pd
+from tqdm import tqdm
+
+from artifact_cache import ArtifactCache
+from face_results import EMOTION_LABELS
+from log_retention import LOGS_DIR, log_segments, strip_log_suffix
+from process_emotion import artifact_paths, process_emotion_csv
+
+
+def find_raw_logs(logs_dir=LOGS_DIR):
+    """Segment-0 path of every raw log under logs_dir/session_*, compressed or not."""
+    logs = []
+    for session in sorted(os.listdir(logs_dir)) if os.path.isdir(logs_dir) else []:
+        session_dir = os.path.join(logs_dir, session)
+        if not session.startswith("session_") or not os.path.isdir(session_dir):
+            continue
+        names = {strip_log_suffix(entry).split(".")[0] for entry in os.listdir(session_dir)
+                 if entry.startswith("raw_emotion_log_")}
+        logs.extend(os.path.join(session_dir, name + ".csv") for name in sorted(names))
+    return logs
+
+
+def processed_path(raw_csv):
+    """raw_emotion_log_<ts>.csv -> processed_emotion_log_<ts>.csv, as EmotionCSVLogger names it."""
+    name = os.path.basename(raw_csv).replace("raw_emotion_log_", "processed_emotion_log_", 1)
+    return os.path.join(os.path.dirname(raw_csv), name)
+
+
+def summarize(smoothed_csv):
+    df = pd.read_csv(smoothed_csv)
+    times = pd.to_datetime(df["timestamp"], format="ISO8601")
+    shares = df["smoothed_emotion"].value_counts(normalize=True)
+    row = {"rows": len(df), "start": times.min(), "end": times.max(),
+           "minutes": round((times.max() - times.min()).total_seconds() / 60, 1),
+           "dominant": shares.idxmax() if len(shares) else None}
+    row.update({emotion: round(float(shares.get(emotion, 0.0)), 3) for emotion in EMOTION_LABELS})
+    return row
+
+
+def is_current(raw_csv, window_size, cache=None):
+    """True if the log's smoothed CSV and charts were produced from its current segments with window_size."""
+    cache = cache or ArtifactCache()
+    key = cache.key(log_segments(raw_csv), window_size=window_size)
+    return cache.is_current(key, artifact_paths(processed_path(raw_csv)))
+
+
+def process_log(task):
+    """Worker: smooth and plot one raw log (or just summarize it when up to date); returns a summary row."""
+    raw_csv, window_size, stale = task
+    output_csv = processed_path(raw_csv)
+    row = {"session": os.path.basename(os.path.dirname(raw_csv)), "log": os.path.basename(raw_csv)}
+    started = time.perf_counter()
+    try:
+        if stale:
+            process_emotion_csv(raw_csv, output_csv, window_size=window_size)
+            row["status"] = "processed" if os.path.exists(output_csv) else "empty"
+        else:
+            row["status"] = "up to date"
+        if os.path.exists(output_csv):
+            row.update(summarize(output_csv))
+    except Exception as e:
+        row["status"] = f"failed: {e}"
+    row["seconds"] = round(time.perf_counter() - started, 2)
+    return row
+
+
+def _init_worker():
+    import io
+    import sys
+    # Per-file [PROCESS]/[PLOT] lines would tear up the progress bar
+    sys.stdout = io.StringIO()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smooth, plot and summarize every session log")
+    parser.add_argument("--logs", type=str, default=LOGS_DIR, help="Logs directory")
+    parser.add_argument("--window-size", type=int, default=25, help="Smoothing window in rows")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--force", action="store_true", help="Reprocess logs whose outputs are up to date")
+    parser.add_argument("--summary", type=str, default=None,
+                        help="Summary CSV (default: <logs>/summary.csv)")
+    args = parser.parse_args()
+
+    logs = find_raw_logs(args.logs)
+    if not logs:
+        print(f"[BATCH] No session logs under {args.logs}")
+        return
+
+    started = time.perf_counter()
+    stale = [raw_csv for raw_csv in logs if args.force or not is_current(raw_csv, args.window_size)]
+    # Up-to-date logs are only summarized, which is cheaper than starting a worker
+    rows = [process_log((raw_csv, args.window_size, False)) for raw_csv in logs if raw_csv not in stale]
+    if stale:
+        workers = max(1, min(args.workers, len(stale)))
+        print(f"[BATCH] {len(stale)} of {len(logs)} log(s) to process on {workers} worker(s), "
+              f"window_size={args.window_size}")
+        tasks = [(raw_csv, args.window_size, True) for raw_csv in stale]
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_worker) as pool:
+            rows.extend(tqdm(pool.imap(process_log, tasks), total=len(tasks), unit="log"))
+
+    summary = pd.DataFrame(rows).sort_values(["session", "log"], ignore_index=True)
+    summary_path = args.summary or os.path.join(args.logs, "summary.csv")
+    summary.to_csv(summary_path, index=False)
+
+    counts = summary["status"].str.split(":").str[0].value_counts()
+    print(summary[[c for c in ("session", "status", "rows", "minutes", "dominant") if c in summary]]
+          .to_string(index=False))
+    print(f"[BATCH] {', '.join(f'{n} {status}' for status, n in counts.items())} "
+          f"in {time.perf_counter() - started:.1f}s")
+    print(f"[BATCH] Summary saved to {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
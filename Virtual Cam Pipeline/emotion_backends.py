@@ -0,0 +1,285 @@
+import http.client
+import json
+import socket
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+
+class StubBackend:
+    """Random emotions for a fixed box, like WebCamSave's placeholder detector.
+
+    Costs next to nothing, so timing a pipeline with it isolates framework overhead.
+    """
+
+    name = "stub"
+
+    def __init__(self, box=(50, 50, 150, 150), seed=0):
+        self.box = tuple(box)
+        self.rng = np.random.default_rng(seed)
+
+    def find_faces(self, img, bgr=True):
+        return [self.box]
+
+    def detect_emotions(self, img, face_rectangles=None):
+        if face_rectangles is None:
+            face_rectangles = self.find_faces(img)
+        results = []
+        for box in face_rectangles:
+            scores = self.rng.random(len(EMOTION_LABELS))
+            scores /= scores.sum()
+            results.append({
+                "box": [int(v) for v in box],
+                "emotions": dict(zip(EMOTION_LABELS, scores.tolist())),
+            })
+        return results
+
+
+class FERBackend:
+    """fer.FER with MTCNN, falling back to the OpenCV cascade."""
+
+    name = "fer"
+
+    def __init__(self, mtcnn=True):
+        from fer import FER
+
+        try:
+            self.detector = FER(mtcnn=mtcnn)
+        except Exception as e:
+            if not mtcnn:
+                raise
+            print(f"[BACKEND] MTCNN failed: {e} - falling back to OpenCV cascade")
+            self.detector = FER(mtcnn=False)
+
+    def find_faces(self, img, bgr=True):
+        return self.detector.find_faces(img, bgr=bgr)
+
+    def detect_emotions(self, img, face_rectangles=None):
+        return self.detector.detect_emotions(img, face_rectangles=face_rectangles)
+
+    def classify_batch(self, items, offset=10):
+        """Classify the faces of several frames in one model call.
+
+        items is a list of (img, face_rectangles); returns one emotions_data
+        list per item.  Uses FER's loaded Keras classifier directly and falls
+        back to per-frame detect_emotions if that attribute is unavailable.
+        """
+        model = getattr(self.detector, "_FER__emotion_classifier", None)
+        if model is None:
+            return [self.detect_emotions(img, faces) for img, faces in items]
+
+        target_h, target_w = model.input_shape[1:3]
+        crops, owners = face_crops(items, (target_w, target_h), self.find_faces, offset)
+        if not crops:
+            return [[] for _ in items]
+        batch = (np.stack(crops).astype(np.float32) / 255.0 - 0.5) * 2.0
+        scores = np.asarray(model.predict_on_batch(batch[..., np.newaxis]))
+        return group_results(len(items), owners, scores)
+
+
+class DeepFaceBackend:
+    """DeepFace's emotion model on face crops, mapped onto the FER result schema.
+
+    DeepFace.analyze() re-runs detection and looks the model up on every
+    call.  Here the emotion model is built once, faces are found with a
+    selectable detector_backend (opencv is the fastest), and only the face
+    crops are classified - in one batch, for every face in the frame.  When
+    face_rectangles are passed, detection is skipped entirely.
+    """
+
+    name = "deepface"
+
+    def __init__(self, detector_backend="opencv", offset=0):
+        from deepface import DeepFace
+
+        self.deepface = DeepFace
+        self.detector_backend = detector_backend
+        self.offset = offset
+        try:
+            built = DeepFace.build_model(task="facial_attribute", model_name="Emotion")
+        except TypeError:
+            built = DeepFace.build_model("Emotion")  # deepface < 0.0.90
+        # Client wrappers keep the Keras model in .model
+        self.model = getattr(built, "model", built)
+
+    def find_faces(self, img, bgr=True):
+        if not bgr:
+            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+        faces = self.deepface.extract_faces(img, detector_backend=self.detector_backend,
+                                            enforce_detection=False, align=False)
+        # With enforce_detection=False a miss returns the whole frame at confidence 0
+        return [tuple(int(face["facial_area"][k]) for k in ("x", "y", "w", "h"))
+                for face in faces if face.get("confidence", 0) > 0]
+
+    def detect_emotions(self, img, face_rectangles=None):
+        return self.classify_batch([(img, face_rectangles)])[0]
+
+    def classify_batch(self, items):
+        target_h, target_w = self.model.input_shape[1:3]
+        crops, owners = face_crops(items, (target_w, target_h), self.find_faces, self.offset)
+        if not crops:
+            return [[] for _ in items]
+        batch = np.stack(crops).astype(np.float32) / 255.0
+        scores = np.asarray(self.model.predict_on_batch(batch[..., np.newaxis]))
+        scores = scores / np.maximum(scores.sum(axis=1, keepdims=True), 1e-9)
+        return group_results(len(items), owners, scores)
+
+
+class YOLOBackend:
+    """The trained YOLOv5 live_detector: boxes and emotions from a single pass.
+
+    find_faces() runs the model and detect_emotions() on the same frame
+    returns the cached result, so the pipelines' two stages cost one pass.
+    """
+
+    name = "yolo"
+    # Boxes come from the same pass as the emotions; cropping the search would not save anything
+    single_pass = True
+
+    def __init__(self, weights=None, fmt="pt", threads=0, conf=0.3):
+        from yolo_model import YOLOEmotionDetector
+
+        self.detector = YOLOEmotionDetector(weights, fmt, threads, conf=conf)
+
+    def find_faces(self, img, bgr=True):
+        return self.detector.find_faces(img, bgr=bgr)
+
+    def detect_emotions(self, img, face_rectangles=None):
+        return self.detector.detect_emotions(img, face_rectangles=face_rectangles)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class RemoteBackend:
+    """Thin client for inference_service.py, so several tools share one warm model.
+
+    url is http://127.0.0.1:PORT or unix:///path/to/socket.  Frames travel
+    as JPEG unless raw=True (faster to encode, larger on the wire).
+    """
+
+    name = "remote"
+    # The service detects faces itself, so there are no boxes to search around
+    single_pass = True
+
+    def __init__(self, url="http://127.0.0.1:8765", raw=False, jpeg_quality=90, timeout=30):
+        self.url = url
+        self.raw = raw
+        self.jpeg_quality = jpeg_quality
+        self.timeout = timeout
+        self.conn = None
+
+    def _connect(self):
+        parsed = urlparse(self.url)
+        if parsed.scheme == "unix":
+            return UnixHTTPConnection(parsed.path, timeout=self.timeout)
+        return http.client.HTTPConnection(parsed.hostname or "127.0.0.1", parsed.port or 8765,
+                                          timeout=self.timeout)
+
+    def _post(self, path, img, face_rectangles=None):
+        if self.raw:
+            body = np.ascontiguousarray(img).tobytes()
+            headers = {"Content-Type": "application/octet-stream",
+                       "X-Frame-Shape": ",".join(str(v) for v in img.shape)}
+        else:
+            ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                raise ValueError("Could not JPEG-encode frame")
+            body = encoded.tobytes()
+            headers = {"Content-Type": "image/jpeg"}
+        if face_rectangles is not None:
+            headers["X-Faces"] = json.dumps([[int(v) for v in box] for box in face_rectangles])
+
+        # Reuse the keep-alive connection; reconnect once if the server dropped it
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = self._connect()
+            try:
+                self.conn.request("POST", path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                payload = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise RuntimeError(f"Inference service error {response.status}: {payload[:200]!r}")
+        return json.loads(payload)["faces"]
+
+    def find_faces(self, img, bgr=True):
+        return None
+
+    def detect_emotions(self, img, face_rectangles=None):
+        return self._post("/detect", img, face_rectangles)
+
+    def classify_crop(self, crop):
+        return self._post("/classify", crop)
+
+
+def face_crops(items, size, find_faces, offset=10):
+    """Gray face crops resized to size=(w, h) for every face of every (img, faces) item.
+
+    Returns (crops, owners) where owners[i] is (item index, [x, y, w, h]).
+    """
+    crops, owners = [], []
+    for item_idx, (img, faces) in enumerate(items):
+        if faces is None:
+            faces = find_faces(img)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape
+        for x, y, w, h in faces:
+            x1, y1 = max(0, x - offset), max(0, y - offset)
+            x2, y2 = min(width, x + w + offset), min(height, y + h + offset)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            crops.append(cv2.resize(gray[y1:y2, x1:x2], size))
+            owners.append((item_idx, [int(x), int(y), int(w), int(h)]))
+    return crops, owners
+
+
+def group_results(count, owners, scores):
+    """Turn one row of class scores per crop back into per-item emotions_data lists."""
+    results = [[] for _ in range(count)]
+    for (item_idx, box), row in zip(owners, scores):
+        results[item_idx].append({
+            "box": box,
+            "emotions": dict(zip(EMOTION_LABELS, row.astype(float).tolist())),
+        })
+    return results
+
+
+BACKENDS = {
+    "stub": StubBackend,
+    "fer": FERBackend,
+    "fer-cascade": lambda **kwargs: FERBackend(mtcnn=False, **kwargs),
+    "deepface": DeepFaceBackend,
+    "yolo": YOLOBackend,
+    "remote": RemoteBackend,
+}
+
+
+def classify_batch(detector, items):
+    """Batch classification across frames when the backend supports it."""
+    if hasattr(detector, "classify_batch"):
+        return detector.classify_batch(items)
+    return [detector.detect_emotions(img, face_rectangles=faces) for img, faces in items]
+
+
+def load_backend(name="fer", **kwargs):
+    """Build a detector exposing FER's find_faces/detect_emotions interface."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
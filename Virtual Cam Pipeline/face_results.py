@@ -0,0 +1,169 @@
+import numpy as np
+
+# Fixed column order of FaceResults.scores
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+
+class FaceResults:
+    """Faces of one frame as arrays: boxes [N x 4] int32 (x, y, w, h), scores [N x 7] float32
+    in EMOTION_LABELS order, and track_ids [N] int32 (detection order until a
+    FaceTracker assigns persistent IDs).
+
+    Adapters convert detector output once; smoothing, rendering and logging
+    then work on the arrays instead of one dict per face.
+    """
+
+    __slots__ = ("boxes", "scores", "track_ids")
+    labels = EMOTION_LABELS
+
+    def __init__(self, boxes=None, scores=None, track_ids=None):
+        self.boxes = np.zeros((0, 4), np.int32) if boxes is None else np.asarray(boxes, np.int32).reshape(-1, 4)
+        self.scores = (np.zeros((len(self.boxes), len(EMOTION_LABELS)), np.float32) if scores is None
+                       else np.asarray(scores, np.float32).reshape(-1, len(EMOTION_LABELS)))
+        self.track_ids = (np.arange(len(self.boxes), dtype=np.int32) if track_ids is None
+                          else np.asarray(track_ids, np.int32).reshape(-1))
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __bool__(self):
+        return len(self.boxes) > 0
+
+    # -- adapters -----------------------------------------------------------
+
+    @classmethod
+    def from_fer(cls, emotions_data):
+        """FER's detect_emotions output ([{"box": [x, y, w, h], "emotions": {...}}]), as every backend returns."""
+        if isinstance(emotions_data, cls):
+            return emotions_data
+        if not emotions_data:
+            return cls()
+        boxes = [face["box"] for face in emotions_data]
+        scores = [[face["emotions"].get(label, 0.0) for label in EMOTION_LABELS] for face in emotions_data]
+        return cls(boxes, scores)
+
+    @classmethod
+    def from_deepface(cls, results):
+        """DeepFace.analyze(actions=["emotion"]) output: percentages and a "region" per face."""
+        if isinstance(results, dict):
+            results = [results]
+        if not results:
+            return cls()
+        boxes = [[result.get("region", {}).get(k, 0) for k in ("x", "y", "w", "h")] for result in results]
+        scores = np.array([[result["emotion"].get(label, 0.0) for label in EMOTION_LABELS]
+                           for result in results], dtype=np.float32) / 100.0
+        return cls(boxes, scores)
+
+    @classmethod
+    def from_yolo(cls, xyxy, class_probs, names):
+        """YOLOv5 boxes (x1, y1, x2, y2) with per-class probabilities in the model's `names` order."""
+        xyxy = np.asarray(xyxy, np.float32).reshape(-1, 4)
+        if len(xyxy) == 0:
+            return cls()
+        order = [list(names).index(label) for label in EMOTION_LABELS]
+        scores = np.asarray(class_probs, np.float32).reshape(len(xyxy), -1)[:, order]
+        totals = scores.sum(axis=1, keepdims=True)
+        scores = np.divide(scores, totals, out=scores.copy(), where=totals > 0)
+        boxes = np.column_stack([xyxy[:, :2], xyxy[:, 2:] - xyxy[:, :2]])
+        return cls(boxes, scores)
+
+    def to_fer(self):
+        """Back to the list-of-dicts schema, for code that still expects it."""
+        return [{"box": box.tolist(), "emotions": dict(zip(EMOTION_LABELS, row.tolist()))}
+                for box, row in zip(self.boxes, self.scores)]
+
+    # -- queries ------------------------------------------------------------
+
+    def top(self):
+        """Index into EMOTION_LABELS of each face's dominant emotion."""
+        return self.scores.argmax(axis=1)
+
+    def top_labels(self):
+        return [EMOTION_LABELS[i] for i in self.top()]
+
+    def with_scores(self, scores):
+        return FaceResults(self.boxes, scores, self.track_ids)
+
+    def scale(self, sx, sy):
+        """Map boxes to another resolution in place (e.g. detection frame -> display frame)."""
+        if (sx, sy) != (1.0, 1.0) and len(self.boxes):
+            self.boxes = (self.boxes * np.array([sx, sy, sx, sy], np.float32)).astype(np.int32)
+        return self
+
+
+def box_iou(a, b):
+    """Pairwise IoU of (x, y, w, h) boxes: [N x 4], [M x 4] -> [N x M]."""
+    a = np.asarray(a, np.float32).reshape(-1, 1, 4)
+    b = np.asarray(b, np.float32).reshape(1, -1, 4)
+    w = np.clip(np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    h = np.clip(np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = w * h
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+class FaceTracker:
+    """Persistent track IDs across frames, so per-track state follows a face rather than a detection index.
+
+    Each face takes the ID of the previous box it overlaps most (IoU >=
+    ``min_iou``); failing that, of the previous box whose centre is within
+    ``max_shift`` face sizes of its own, for faces that moved far between
+    inference frames.  Matching is greedy, best pair first.  Tracks unseen
+    for more than ``max_age`` updates are dropped and their IDs reused,
+    lowest first, so per-track arrays stay as small as the crowd.
+    """
+
+    def __init__(self, min_iou=0.3, max_shift=0.5, max_age=5):
+        self.min_iou = min_iou
+        self.max_shift = max_shift
+        self.max_age = max_age
+        self.boxes = {}
+        self.missed = {}
+
+    def _scores(self, boxes, previous):
+        iou = box_iou(boxes, previous)
+        centres = boxes[:, :2] + boxes[:, 2:] / 2
+        previous_centres = previous[:, :2] + previous[:, 2:] / 2
+        distance = np.linalg.norm(centres[:, np.newaxis] - previous_centres[np.newaxis], axis=2)
+        shift = distance / np.maximum(boxes[:, 2:].max(axis=1, keepdims=True), 1.0)
+        # IoU matches (1..2) always rank above centroid matches (0..1); 0 means no match
+        near = np.clip(1.0 - shift / self.max_shift, 0.0, 1.0) if self.max_shift > 0 else np.zeros_like(shift)
+        return np.where(iou >= self.min_iou, 1.0 + iou, near)
+
+    def assign(self, results):
+        """Set results.track_ids in place; returns the IDs that started a new track in this update."""
+        boxes = results.boxes.astype(np.float32)
+        ids = np.full(len(boxes), -1, np.int32)
+        known = list(self.boxes)
+        if len(boxes) and known:
+            scores = self._scores(boxes, np.array([self.boxes[i] for i in known], np.float32))
+            taken = set()
+            for face, track in zip(*np.unravel_index(np.argsort(-scores, axis=None, kind="stable"), scores.shape)):
+                if scores[face, track] <= 0:
+                    break
+                if ids[face] < 0 and track not in taken:
+                    ids[face] = known[track]
+                    taken.add(track)
+
+        started = []
+        free = (i for i in range(len(self.boxes) + len(boxes) + 1) if i not in self.boxes)
+        for face in np.flatnonzero(ids < 0):
+            ids[face] = next(free)
+            started.append(int(ids[face]))
+
+        matched = set(ids.tolist())
+        for track in known:
+            if track not in matched:
+                self.missed[track] += 1
+                if self.missed[track] > self.max_age:
+                    del self.boxes[track], self.missed[track]
+        for track, box in zip(ids.tolist(), boxes):
+            self.boxes[track] = box
+            self.missed[track] = 0
+
+        results.track_ids = ids
+        return started
+
+    def reset(self):
+        self.boxes.clear()
+        self.missed.clear()
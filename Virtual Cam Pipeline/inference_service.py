@@ -0,0 +1,244 @@
+"""inference_service.py
+--------------------------------
+Local emotion-recognition service.  One warm model is shared by every
+tool on the machine (GUI, OBS pipeline, recorders); requests arriving
+within ``--max-wait-ms`` of each other are classified together in one
+micro-batch.
+
+Endpoints (HTTP on localhost or a UNIX socket):
+
+* ``POST /detect``   – JPEG/PNG frame, or raw bytes with ``X-Frame-Shape: H,W,C``.
+  Optional ``X-Faces: [[x, y, w, h], ...]`` skips detection.
+* ``POST /classify`` – a single face crop in the same encodings.
+* ``GET  /health``   – backend name and batching statistics.
+
+Responses are ``{"faces": [{"box": [x, y, w, h], "emotions": {...}}]}``
+with scores normalised to sum to 1.  Use ``emotion_backends.RemoteBackend``
+(``load_backend("remote", url=...)``) as the client.
+
+```bash
+python inference_service.py --backend fer --port 8765 --max-wait-ms 10
+python inference_service.py --backend fer --unix /tmp/fer.sock
+```
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from emotion_backends import BACKENDS, EMOTION_LABELS, classify_batch, load_backend
+
+
+class MicroBatcher:
+    """Owns the detector; collects requests for up to max_wait seconds and runs them together."""
+
+    def __init__(self, detector, max_batch=16, max_wait=0.01):
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.stats = {"requests": 0, "batches": 0, "errors": 0, "busy_s": 0.0}
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, img, faces=None, timeout=30):
+        img, faces = validate_request(img, faces)
+        future = Future()
+        self.queue.put((img, faces, future))
+        return future.result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                items = [(img, faces if faces is not None else self.detector.find_faces(img, bgr=True))
+                         for img, faces, _ in batch]
+                results = classify_batch(self.detector, items)
+                for (_, _, future), emotions_data in zip(batch, results):
+                    future.set_result(normalize_results(emotions_data))
+            except Exception:
+                # Don't let one bad request fail its neighbours: rerun each on its own
+                for img, faces, future in batch:
+                    if not future.done():
+                        self._run_single(img, faces, future)
+            self.stats["busy_s"] += time.perf_counter() - start
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+
+    def _run_single(self, img, faces, future):
+        try:
+            if faces is None:
+                faces = self.detector.find_faces(img, bgr=True)
+            future.set_result(normalize_results(classify_batch(self.detector, [(img, faces)])[0]))
+        except Exception as e:
+            self.stats["errors"] += 1
+            future.set_exception(e)
+
+
+def validate_request(img, faces):
+    """Reject requests that would break a shared batch; returns (img, faces as int 4-tuples)."""
+    if not isinstance(img, np.ndarray) or img.ndim != 3 or img.shape[2] != 3 or img.size == 0:
+        raise ValueError("Frame must be a non-empty H x W x 3 image")
+    if faces is None:
+        return img, None
+    boxes = []
+    for box in faces:
+        if len(box) != 4 or not all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in box):
+            raise ValueError(f"Face box must be four integers, got {box!r}")
+        x, y, w, h = (int(v) for v in box)
+        if w <= 0 or h <= 0:
+            raise ValueError(f"Face box must have positive size, got {box!r}")
+        boxes.append((x, y, w, h))
+    return img, boxes
+
+
+def normalize_results(emotions_data):
+    faces = []
+    for face in emotions_data:
+        scores = np.array([float(face["emotions"].get(label, 0.0)) for label in EMOTION_LABELS])
+        total = scores.sum()
+        if total > 0:
+            scores /= total
+        faces.append({
+            "box": [int(v) for v in face["box"]],
+            "emotions": dict(zip(EMOTION_LABELS, scores.round(4).tolist())),
+        })
+    return faces
+
+
+def decode_frame(body, headers):
+    content_type = headers.get("Content-Type", "")
+    if content_type.startswith("application/octet-stream"):
+        shape = tuple(int(v) for v in headers.get("X-Frame-Shape", "").split(","))
+        return np.frombuffer(body, dtype=np.uint8).reshape(shape)
+    img = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Body is not a decodable image")
+    return img
+
+
+def make_handler(batcher, backend_name):
+    class InferenceHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                self._reply(404, {"error": "not found"})
+                return
+            stats = dict(batcher.stats)
+            stats["avg_batch"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+            self._reply(200, {"backend": backend_name, **stats})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            if self.path not in ("/detect", "/classify"):
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                img = decode_frame(body, self.headers)
+                if self.path == "/classify":
+                    faces = [(0, 0, img.shape[1], img.shape[0])]
+                elif self.headers.get("X-Faces"):
+                    faces = [tuple(box) for box in json.loads(self.headers["X-Faces"])]
+                else:
+                    faces = None
+                img, faces = validate_request(img, faces)
+            except Exception as e:
+                self._reply(400, {"error": str(e)})
+                return
+            try:
+                self._reply(200, {"faces": batcher.submit(img, faces)})
+            except Exception as e:
+                self._reply(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return InferenceHandler
+
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared local emotion inference service")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "remote"], default="fer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", type=str, help="Listen on this UNIX socket path instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                        help="How long the first request of a batch waits for company")
+    args = parser.parse_args()
+
+    print(f"Loading {args.backend} backend...")
+    detector = load_backend(args.backend)
+    batcher = MicroBatcher(detector, args.max_batch, args.max_wait_ms / 1000.0)
+    handler = make_handler(batcher, args.backend)
+
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.remove(args.unix)
+        server = UnixHTTPServer(args.unix, handler)
+        where = f"unix://{args.unix}"
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), handler)
+        where = f"http://{args.host}:{args.port}"
+    server.daemon_threads = True
+
+    print(f"[SERVICE] {args.backend} ready on {where} "
+          f"(max batch {args.max_batch}, max wait {args.max_wait_ms:g} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[SERVICE] Shutting down...")
+    finally:
+        server.server_close()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,9 +15,12 @@ pip install --upgrade pyvirtualcam opencv-python
 
 # 3. Launch the pipeline
 python obs_virtual_cam.py --cam-id 0 --width 1280 --height 720 --fps 30
+
+# Optional: watch a downscaled copy while OBS gets full resolution
+python obs_virtual_cam.py --preview
 ```
 
-Press **Ctrl‑C** to stop.
+Press **Ctrl‑C** to stop (or **q** in the preview window).
 """
 
 import argparse
@@ -26,15 +29,21 @@ import os
 import sys
 import time
 import json
-from collections import deque
-
 import cv2
 import numpy as np
 import pyvirtualcam
 from fer import FER
 
-from camera_utils import get_webcam  # noqa: F401 (kept for future use)
+from emotion_backends import BACKENDS, load_backend
+from face_results import FaceResults
+from face_search import RegionFaceSearch
+from frame_sources import open_source
 from visual_utils import draw_emotion_data
+from scene_gate import SceneGate
+from smoothing import EmotionSmoother
+from metrics_utils import StageMetrics, start_metrics_server, draw_metrics_hud
+from video_writer import AsyncVideoWriter
+from preview import PreviewSink
 
 
 # ---------------------------------------------------------------------------
@@ -58,81 +67,180 @@ def init_detector() -> FER:
         return FER(mtcnn=False)
 
 
+class NullCamera:
+    """Stand-in for pyvirtualcam.Camera when running --headless."""
+
+    device = "null"
+
+    def send(self, frame) -> None:
+        pass
+
+    def sleep_until_next_frame(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
 # ---------------------------------------------------------------------------
 # Main loop
 # ---------------------------------------------------------------------------
 
 def main() -> None:
+    # Settings saved from the GUI are the defaults; command-line flags override them
+    config = load_config()
     parser = argparse.ArgumentParser(
         description="Run FER pipeline and stream to OBS Virtual Camera")
-    parser.add_argument("--cam-id", type=int, default=0,
-                        help="Physical webcam index")
+    parser.add_argument("--cam-id", type=int, default=None,
+                        help="Physical webcam index (default: frame_source in config.json)")
+    parser.add_argument("--source", type=str, default=None,
+                        help="Video file, image folder or 'synthetic[:WxH]' instead of the webcam")
+    parser.add_argument("--fast", action="store_true", default=not config.get("source_realtime", True),
+                        help="Process recorded sources as fast as possible")
+    parser.add_argument("--headless", action="store_true",
+                        help="Discard output instead of sending it to the virtual camera")
     parser.add_argument("--width", type=int, default=1280,
                         help="Frame width")
     parser.add_argument("--height", type=int, default=720,
                         help="Frame height")
     parser.add_argument("--fps", type=int, default=30,
                         help="Frames per second")
+    parser.add_argument("--negotiate", action=argparse.BooleanOptionalAction,
+                        default=config.get("negotiate_capture", False),
+                        help="Probe FOURCC/resolution modes once and reuse the best (cached)")
     parser.add_argument("--skip", type=int, default=2,
                         help="Process every N‑th frame to save CPU")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "remote"],
+                        default=config.get("emotion_backend", "fer"),
+                        help="Emotion model; 'yolo' detects and classifies in one pass")
+    parser.add_argument("--record", type=str, default=None,
+                        help="Also save the annotated output to this video file "
+                             "(record_toggle in config.json records to logs/)")
+    parser.add_argument("--record-codec", type=str, default=config.get("record_codec", "XVID"),
+                        help="FOURCC for --record")
+    parser.add_argument("--service", type=str, default=config.get("inference_service") or None,
+                        help="Use a running inference_service.py (e.g. http://127.0.0.1:8765) "
+                             "instead of loading FER in-process")
+    parser.add_argument("--metrics-port", type=int, default=config.get("metrics_port", 9108),
+                        help="Serve Prometheus stage latencies on localhost (0 = off)")
+    parser.add_argument("--preview", action="store_true",
+                        help="Also show a downscaled preview window (\"preview\" in config.json)")
+    parser.add_argument("--hud", action=argparse.BooleanOptionalAction,
+                        default=config.get("metrics_hud_toggle", False),
+                        help="Draw per-stage latency percentiles onto the stream")
     args = parser.parse_args()
+    if args.record is None and config.get("record_toggle", False):
+        os.makedirs("logs", exist_ok=True)
+        args.record = os.path.join("logs", f"recording_{time.strftime('%Y-%m-%d_%H-%M-%S')}.avi")
 
     logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 
-    # ── Physical webcam ────────────────────────────────────────────────────
-    cap = cv2.VideoCapture(args.cam_id)
-    if not cap.isOpened():
-        logging.error("Could not open webcam – check --cam-id")
+    # ── Frame source (physical webcam unless --source) ─────────────────────
+    try:
+        source = args.source or (args.cam_id if args.cam_id is not None else config.get("frame_source", 0))
+        cap = open_source(source,
+                          realtime=not args.fast, width=args.width,
+                          height=args.height, fps=args.fps,
+                          negotiate=args.negotiate)
+    except IOError as e:
+        logging.error("%s – check --cam-id / --source", e)
         sys.exit(1)
 
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, args.width)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, args.height)
-    cap.set(cv2.CAP_PROP_FPS, args.fps)
-
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    logging.info("Webcam initialised @ %dx%d %d FPS", width, height, args.fps)
+    width, height = cap.width, cap.height
+    logging.info("Source initialised @ %dx%d %g FPS", width, height, cap.fps)
 
     # ── OBS Virtual Camera ────────────────────────────────────────────────
-    try:
-        cam = pyvirtualcam.Camera(width=width, height=height, fps=args.fps,
-                                  print_fps=False, backend="obs")
-    except Exception as e:
-        logging.error(
-            "pyvirtualcam failed to open OBS Virtual Camera.\n"
-            , e)
-        sys.exit(2)
+    if args.headless:
+        cam = NullCamera()
+    else:
+        try:
+            cam = pyvirtualcam.Camera(width=width, height=height, fps=args.fps,
+                                      print_fps=False, backend="obs")
+        except Exception as e:
+            logging.error(
+                "pyvirtualcam failed to open OBS Virtual Camera: %s", e)
+            sys.exit(2)
 
     logging.info("Streaming to virtual camera device: %s", cam.device)
 
-    detector = init_detector()
-    config = load_config()
-    emotion_history: deque = deque(maxlen=30)
+    if args.service:
+        logging.info("Using shared inference service at %s", args.service)
+        detector = load_backend("remote", url=args.service)
+    elif args.backend != "fer":
+        logging.info("Loading %s backend…", args.backend)
+        detector = load_backend(args.backend)
+    else:
+        detector = init_detector()
+    smoother = EmotionSmoother.from_config(config.get("smoothing"))
+    # Ticks are counted in output time, so --skip keeps its meaning with or without gating
+    gate = SceneGate.from_config(config.get("scene_gate"), interval=args.skip / args.fps)
+    results = smoothed = FaceResults()
+    detector = RegionFaceSearch.from_config(detector, config.get("roi_search"))
     frame_idx = 0
 
+    metrics = StageMetrics()
+    if args.metrics_port:
+        start_metrics_server(metrics, port=args.metrics_port)
+
+    recorder = None
+    if args.record:
+        record_size = (config.get("record_width", 0), config.get("record_height", 0))
+        recorder = AsyncVideoWriter(args.record, fps=config.get("record_fps", 0) or args.fps,
+                                    size=record_size if all(record_size) else (width, height),
+                                    codec=args.record_codec, block=not cap.realtime)
+        logging.info("Recording to %s", args.record)
+
+    # The virtual camera and recording get the full frame; the preview a downscaled copy
+    preview = PreviewSink.from_config(config.get("preview")) if args.preview else None
+
     try:
         while True:
-            ok, frame_bgr = cap.read()
+            with metrics.time("capture"):
+                ok, frame_bgr = cap.read()
             if not ok:
+                if cap.kind != "webcam":
+                    logging.info("End of source.")
+                    break
                 logging.warning("Webcam frame grab failed – retrying…")
                 time.sleep(0.05)
                 continue
 
             # Resize if needed
-            if frame_bgr.shape[1] != width or frame_bgr.shape[0] != height:
-                frame_bgr = cv2.resize(frame_bgr, (width, height))
+            with metrics.time("preprocess"):
+                if frame_bgr.shape[1] != width or frame_bgr.shape[0] != height:
+                    frame_bgr = cv2.resize(frame_bgr, (width, height))
+
+            # Heavy FER at most every --skip frames, and only if the picture changed
+            with metrics.time("gate"):
+                run_inference = gate.check(frame_bgr, results.boxes, frame_idx / args.fps)
 
-            # Heavy FER only every --skip frames
-            if frame_idx % args.skip == 0:
-                emotions = detector.detect_emotions(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB))
-            else:
-                emotions = []
+            # Every backend takes BGR frames, like cv2 delivers them
+            if run_inference:
+                with metrics.time("detect"):
+                    faces = detector.find_faces(frame_bgr, bgr=True, now=frame_idx / args.fps)
+                with metrics.time("classify"):
+                    results = FaceResults.from_fer(detector.detect_emotions(frame_bgr, face_rectangles=faces))
+                with metrics.time("smooth"):
+                    smoothed = smoother.smooth_results(results)
 
             # Draw overlay
-            frame_bgr = draw_emotion_data(
-                frame_bgr, emotions, emotion_history, config.get("emoji_paths", {}))
+            with metrics.time("overlay"):
+                frame_bgr = draw_emotion_data(
+                    frame_bgr, smoothed, None, config.get("emoji_paths", {}),
+                    smooth=False)
+                if args.hud:
+                    draw_metrics_hud(frame_bgr, metrics)
 
-            cam.send(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB))
+            with metrics.time("output"):
+                cam.send(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB))
+                if recorder is not None:
+                    recorder.write(frame_bgr)
+                if preview is not None:
+                    preview.show(frame_bgr)
+            metrics.frame_done()
+            if preview is not None and preview.key() in (27, ord("q")):
+                logging.info("Preview closed – shutting down…")
+                break
             cam.sleep_until_next_frame()
             frame_idx += 1
 
@@ -142,6 +250,12 @@ def main() -> None:
     finally:
         cap.release()
         cam.close()
+        if recorder is not None:
+            recorder.release()
+        if preview is not None:
+            preview.close()
+        gate.report(metrics)
+        detector.report()
         logging.info("Camera resources released.")
 
 
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import cv2
+
+
+class PreviewSink:
+    """Downscaled on-screen preview of the annotated output.
+
+    show() only hands the frame over and returns; the preview thread
+    resizes it to fit ``max_width`` x ``max_height`` and draws it, at most
+    ``fps`` times per second.  Frames arriving faster are skipped, and a
+    frame still waiting when a newer one arrives is dropped, so a slow window
+    never holds up capture.  Recording and virtual-camera output keep using
+    the full-resolution frame.  With ``threaded=False`` (HighGUI without
+    thread support, e.g. macOS) the same downscaled drawing happens inline.
+    """
+
+    def __init__(self, window="Emoji Cam", max_width=960, max_height=540, fps=15.0, threaded=True):
+        self.window = window
+        self.max_width = max_width
+        self.max_height = max_height
+        self.fps = fps
+        self.shown = 0
+        self.dropped = 0
+        self._last = None
+        self._key = -1
+        self._pending = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        if threaded:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    @classmethod
+    def from_config(cls, config=None, window="Emoji Cam"):
+        """Build from the "preview" block of config.json."""
+        config = dict(config or {})
+        return cls(window=window, max_width=config.get("max_width", 960),
+                   max_height=config.get("max_height", 540), fps=config.get("fps", 15.0),
+                   threaded=config.get("threaded", True))
+
+    def _fit(self, frame):
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.max_width / width if self.max_width else 1.0,
+                    self.max_height / height if self.max_height else 1.0)
+        if scale >= 1.0:
+            return frame
+        return cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    def _pump(self):
+        key = cv2.waitKey(1) & 0xFF
+        if key != 0xFF:
+            self._key = key
+
+    def _display(self, frame):
+        cv2.imshow(self.window, self._fit(frame))
+        self._pump()
+        self.shown += 1
+
+    def show(self, frame, now=None):
+        """Offer a frame for preview; the caller must not draw on it afterwards."""
+        now = time.perf_counter() if now is None else now
+        if self.fps and self._last is not None and now - self._last < 1.0 / self.fps:
+            return False
+        self._last = now
+        if self._thread is None:
+            self._display(frame)
+            return True
+        with self._lock:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = frame
+        self._ready.set()
+        return True
+
+    def key(self):
+        """Last key pressed in the preview window, or -1; reading it clears it."""
+        key, self._key = self._key, -1
+        return key
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self._ready.wait(0.05):
+                # Keep the window responsive between frames
+                if self.shown:
+                    self._pump()
+                continue
+            self._ready.clear()
+            with self._lock:
+                frame, self._pending = self._pending, None
+            if frame is not None:
+                self._display(frame)
+        if self.shown:
+            cv2.destroyWindow(self.window)
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=1.0)
+        elif self.shown:
+            cv2.destroyWindow(self.window)
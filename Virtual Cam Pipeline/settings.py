@@ -3,7 +3,7 @@ import os
 import tkinter as tk
 from tkinter import ttk
 import tkinter.messagebox as messagebox
-import shutil
+from log_retention import clear_logs_async
 
 CONFIG_FILE = "config.json"
 
@@ -19,7 +19,23 @@ default_config = {
     "mirror_toggle": False,
     "fps_toggle": False,
     "logging_toggle": True,
-    "overlay_location": 1
+    "metrics_hud_toggle": False,
+    "record_toggle": False,
+    "overlay_location": 1,
+    "metrics_port": 9108,
+    "frame_source": 0,
+    "source_realtime": True,
+    "inference_service": "",
+    "emotion_backend": "fer",
+    "smoothing": {"method": "ema", "alpha": 0.6, "window": 5, "stay": 0.9, "track": True},
+    "scene_gate": {"enabled": True, "motion_threshold": 6.0, "scene_threshold": 30.0, "max_skip": 2.0},
+    "roi_search": {"enabled": True, "margin": 0.5, "sweep_interval": 2.0},
+    "record_codec": "XVID",
+    "record_fps": 0,
+    "record_width": 0,
+    "record_height": 0,
+    "negotiate_capture": False,
+    "preview": {"max_width": 960, "max_height": 540, "fps": 15, "threaded": True}
 }
 
 display_names = {
@@ -34,6 +50,8 @@ display_names = {
     "mirror_toggle": "Mirror Video",
     "fps_toggle": "FPS Display",
     "logging_toggle": "Session Logging",
+    "metrics_hud_toggle": "Latency HUD",
+    "record_toggle": "Record Session Video",
     "overlay_location": "Overlay Location"
 }
 
@@ -89,6 +107,8 @@ def edit_settings(parent):
         "mirror_toggle", 
         "fps_toggle", 
         "logging_toggle", 
+        "metrics_hud_toggle",
+        "record_toggle",
     ]
     for i, key in enumerate(toggle_keys):
         var = tk.BooleanVar(value=config.get(key, default_config[key]))
@@ -167,13 +187,9 @@ def clear_logs():
     if not messagebox.askyesno("Confirm Clear Logs", "Are you sure you want to delete all logs?"):
         return
 
+    # Sessions are moved aside instantly and deleted on a worker thread, so the UI never blocks
     try:
-        for entry in os.listdir(logs_dir):
-            path = os.path.join(logs_dir, entry)
-            if os.path.isdir(path):
-                shutil.rmtree(path)
-            else:
-                os.remove(path)
-        messagebox.showinfo("Clear Logs", "All logs cleared successfully.")
+        clear_logs_async(logs_dir, done=lambda count: print(f"[LOGS] Deleted {count} log entries"))
+        messagebox.showinfo("Clear Logs", "Logs are being deleted in the background.")
     except Exception as e:
         messagebox.showerror("Error", f"Failed to clear logs:\n{e}")
\ No newline at end of file
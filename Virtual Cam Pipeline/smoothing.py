@@ -0,0 +1,122 @@
+import numpy as np
+
+from face_results import EMOTION_LABELS, FaceTracker
+
+METHODS = ("ema", "median", "hmm", "none")
+
+
+class EmotionSmoother:
+    """Temporal smoothing of emotion scores, one row of a float32 [tracks x 7] array per track.
+
+    All tracks seen in a frame are updated in one vectorised step.
+
+    * ema    - exponential moving average, weight ``alpha`` on the new scores.
+    * median - per-emotion median over the last ``window`` observations.
+    * hmm    - online forward filtering: the emotion persists between
+      observations with probability ``stay``; the classifier scores are
+      treated as observation likelihoods.
+    * none   - pass scores through unchanged.
+
+    smooth_results() first matches faces to the previous frame's with a
+    FaceTracker (track=True), so each face keeps its own state when the
+    detector returns faces in a different order; update() and smooth() take
+    explicit track_ids.
+
+    Results are new objects; the detector's output is never modified.
+    """
+
+    def __init__(self, method="ema", alpha=0.6, window=5, stay=0.9, labels=EMOTION_LABELS, tracks=8, track=True):
+        if method not in METHODS:
+            raise ValueError(f"Unknown smoothing method '{method}'. Choose from: {', '.join(METHODS)}")
+        self.method = method
+        self.alpha = np.float32(alpha)
+        self.window = max(1, int(window))
+        self.labels = list(labels)
+        classes = len(self.labels)
+        self.transition = np.full((classes, classes), (1.0 - stay) / max(1, classes - 1), dtype=np.float32)
+        np.fill_diagonal(self.transition, stay)
+        self.tracker = FaceTracker() if track else None
+        self._allocate(tracks)
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Build from the "smoothing" block of config.json."""
+        config = dict(config or {})
+        return cls(method=config.get("method", "ema"), alpha=config.get("alpha", 0.6),
+                   window=config.get("window", 5), stay=config.get("stay", 0.9),
+                   track=config.get("track", True))
+
+    def _allocate(self, tracks):
+        classes = len(self.labels)
+        self.state = np.zeros((tracks, classes), dtype=np.float32)
+        self.seen = np.zeros(tracks, dtype=bool)
+        # Ring buffer of past observations for the median; NaN marks empty slots
+        self.history = np.full((self.window, tracks, classes), np.nan, dtype=np.float32)
+        self.cursor = np.zeros(tracks, dtype=np.int64)
+
+    def _grow(self, tracks):
+        old_state, old_seen, old_history, old_cursor = self.state, self.seen, self.history, self.cursor
+        self._allocate(max(tracks, 2 * len(old_seen)))
+        count = len(old_seen)
+        self.state[:count] = old_state
+        self.seen[:count] = old_seen
+        self.history[:, :count] = old_history
+        self.cursor[:count] = old_cursor
+
+    def update(self, scores, track_ids=None):
+        """Smooth an [n x 7] score array for tracks track_ids (default 0..n-1); returns [n x 7]."""
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1, len(self.labels))
+        ids = np.arange(len(scores)) if track_ids is None else np.asarray(track_ids, dtype=np.int64)
+        if len(ids) == 0 or self.method == "none":
+            return scores
+        if ids.max() >= len(self.seen):
+            self._grow(int(ids.max()) + 1)
+
+        seen = self.seen[ids, np.newaxis]
+        if self.method == "ema":
+            smoothed = np.where(seen, self.alpha * scores + (1 - self.alpha) * self.state[ids], scores)
+        elif self.method == "median":
+            self.history[self.cursor[ids] % self.window, ids] = scores
+            self.cursor[ids] += 1
+            smoothed = np.nanmedian(self.history[:, ids], axis=0)
+        else:
+            prior = np.where(seen, self.state[ids] @ self.transition, np.float32(1.0 / len(self.labels)))
+            smoothed = prior * np.maximum(scores, 1e-6)
+            smoothed /= smoothed.sum(axis=1, keepdims=True)
+
+        smoothed = smoothed.astype(np.float32)
+        self.state[ids] = smoothed
+        self.seen[ids] = True
+        return smoothed
+
+    def smooth_results(self, results):
+        """Smoothed copy of a FaceResults, one track per results.track_ids entry.
+
+        With a tracker, results.track_ids is first replaced by persistent IDs;
+        a reused ID starts from fresh state.
+        """
+        if self.tracker is not None:
+            started = [i for i in self.tracker.assign(results) if i < len(self.seen)]
+            if started:
+                self.reset(started)
+        return results.with_scores(self.update(results.scores, results.track_ids))
+
+    def smooth(self, emotions_data, track_ids=None):
+        """Smoothed copy of FER-style emotions_data; faces are tracks by index unless track_ids is given."""
+        if not emotions_data:
+            return []
+        scores = np.array([[face["emotions"].get(label, 0.0) for label in self.labels]
+                           for face in emotions_data], dtype=np.float32)
+        smoothed = self.update(scores, track_ids)
+        return [{**face, "emotions": dict(zip(self.labels, row.tolist()))}
+                for face, row in zip(emotions_data, smoothed)]
+
+    def reset(self, track_ids=None):
+        """Forget the state of some tracks (or all of them)."""
+        if track_ids is None and self.tracker is not None:
+            self.tracker.reset()
+        ids = slice(None) if track_ids is None else np.asarray(track_ids, dtype=np.int64)
+        self.state[ids] = 0
+        self.seen[ids] = False
+        self.history[:, ids] = np.nan
+        self.cursor[ids] = 0
@@ -1,6 +1,9 @@
 import cv2
 import os
 import json
+import numpy as np
+from face_results import EMOTION_LABELS, FaceResults
+from smoothing import EmotionSmoother
 
 emotion_colors = {
     "angry": (0, 0, 255),
@@ -16,19 +19,42 @@ EMOJI_RESOLUTION = 160
 
 emotion_tally = {emotion: 0 for emotion in emotion_colors.keys()}
 
-def draw_emotion_data(frame, emotions_data, emotion_history, emoji_paths):
-    config_path = "config.json"
-    if os.path.exists(config_path):
-        with open(config_path, "r") as f:
-            config = json.load(f)
-    else:
-        config = {}
+def _history_smoother(emotion_history, alpha=0.6):
+    smoother = emotion_history.get("smoother")
+    if smoother is None:
+        smoother = emotion_history["smoother"] = EmotionSmoother("ema", alpha=alpha)
+    return smoother
+
+def smooth_emotion_data(emotions_data, emotion_history, alpha=0.6):
+    """In-place EMA for callers keeping an emotion_history dict; pipelines use EmotionSmoother directly."""
+    smoother = _history_smoother(emotion_history, alpha)
+    for face_data, smoothed in zip(emotions_data, smoother.smooth(emotions_data)):
+        face_data["emotions"].update(smoothed["emotions"])
+    return emotions_data
+
+def draw_emotion_data(frame, emotions_data, emotion_history, emoji_paths, smooth=True, tally=None, config=None):
+    """Draw the overlay for a FaceResults (FER-style lists are converted first).
+
+    config: the caller's live settings; config.json is read when it is None.
+    """
+    if config is None:
+        config_path = "config.json"
+        if os.path.exists(config_path):
+            with open(config_path, "r") as f:
+                config = json.load(f)
+        else:
+            config = {}
 
     from emoji_utils import overlay_emoji
 
     global emotion_tally
 
-    if not emotions_data:
+    # Callers drawing several streams pass their own tally
+    if tally is None:
+        tally = emotion_tally
+
+    results = FaceResults.from_fer(emotions_data)
+    if not results:
         return frame
 
     frame_height, frame_width = frame.shape[:2]
@@ -41,26 +67,16 @@ def draw_emotion_data(frame, emotions_data, emotion_history, emoji_paths):
     emoji_scale = 0.4
     emoji_size = int(EMOJI_RESOLUTION * emoji_scale)
 
-    face_data = emotions_data[0]
-    emotions = face_data["emotions"]
-    top_emotion = max(emotions, key=emotions.get)
-    emotion_tally[top_emotion] += 1
+    tally[EMOTION_LABELS[results.top()[0]]] += 1
 
-    for i, face_data in enumerate(emotions_data):
-        emotions = face_data["emotions"]
-        top_emotion = max(emotions, key=emotions.get)
+    if smooth and emotion_history is not None:
+        results = _history_smoother(emotion_history).smooth_results(results)
 
-        face_id = f"face_{i}"
-        if face_id in emotion_history:
-            alpha = 0.6
-            for emotion in emotions:
-                if emotion in emotion_history[face_id]:
-                    emotions[emotion] = (alpha * emotions[emotion] +
-                                         (1 - alpha) * emotion_history[face_id][emotion])
-            top_emotion = max(emotions, key=emotions.get)
-        emotion_history[face_id] = emotions.copy()
+    # Best-first emotion order per face, computed for all faces at once
+    order = np.argsort(-results.scores, axis=1, kind="stable")
 
-        label = f"{top_emotion.capitalize()}: {int(emotions[top_emotion] * 100)}%"
+    for i, scores in enumerate(results.scores):
+        top_emotion = EMOTION_LABELS[order[i, 0]]
 
         emoji_path = emoji_paths.get(top_emotion.lower())
         if config.get("emoji_toggle", True) and emoji_path:
@@ -94,7 +110,7 @@ def draw_emotion_data(frame, emotions_data, emotion_history, emoji_paths):
         bar_height = 25
         font_scale = 0.5
         font_thickness = 1
-        sorted_emotions = sorted(emotions.items(), key=lambda item: item[1], reverse=True)
+        sorted_emotions = [(EMOTION_LABELS[k], float(scores[k])) for k in order[i]]
 
         if bars_below:
             bar_y_start = emoji_y + emoji_size + (frame_height // 100)
@@ -127,15 +143,15 @@ def draw_emotion_data(frame, emotions_data, emotion_history, emoji_paths):
         label_y = bar_y_start + (len(sorted_emotions[:7]) * (bar_height + 5)) * bar_direction + (15 * bar_direction)
 
         if config.get("emotion_label_toggle", True):
-            label = f"{top_emotion.capitalize()}: {emotions[top_emotion]:.2f}"
+            label = f"{top_emotion.capitalize()}: {scores[order[i, 0]]:.2f}"
             cv2.putText(frame, label, (bar_x, label_y + (frame_height // 100)),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, emotion_colors.get(top_emotion, (255, 255, 255)), 2)
 
         tally_start_y = label_y + (25 * bar_direction)
-        max_count = max(emotion_tally.values()) if emotion_tally.values() else 1
+        max_count = max(tally.values()) if tally.values() else 1
 
         if config.get("local_history_toggle", True):
-            for k, (emotion, count) in enumerate(sorted(emotion_tally.items(), key=lambda x: x[1], reverse=True)):
+            for k, (emotion, count) in enumerate(sorted(tally.items(), key=lambda x: x[1], reverse=True)):
                 bar_length = int((count / max_count) * bar_width) if max_count > 0 else 0
                 y_offset = tally_start_y + (k * (bar_height + 5)) * bar_direction
                 bar_color = emotion_colors.get(emotion, (255, 255, 255))
@@ -1,26 +1,13 @@
 import cv2
-import torch
 import numpy as np
 import argparse
 import time
 import os
 from datetime import datetime
-
-# Dummy emotion inference (replace with real detector like FER/DeepFace)
-def detect_emotions(frame):
-    # Simulate one face with emotion probabilities
-    return [{
-        "box": [50, 50, 150, 150],  # x, y, w, h
-        "emotions": {
-            "angry": np.random.rand(),
-            "disgust": np.random.rand(),
-            "fear": np.random.rand(),
-            "happy": np.random.rand(),
-            "sad": np.random.rand(),
-            "surprise": np.random.rand(),
-            "neutral": np.random.rand()
-        }
-    }]
+from face_results import EMOTION_LABELS
+from frame_sources import open_source
+from video_writer import AsyncVideoWriter
+from yolo_model import DEFAULT_WEIGHTS, FORMATS, YOLOEmotionDetector
 
 # Emotion color map
 emotion_colors = {
@@ -34,18 +21,18 @@ emotion_colors = {
 }
 
 # Draw emotions with bars
-def draw_emotion_data(frame, emotions_data):
-    for i, face_data in enumerate(emotions_data):
-        x, y, w, h = face_data["box"]
-        emotions = face_data["emotions"]
-        top_emotion = max(emotions, key=emotions.get)
+def draw_emotion_data(frame, results):
+    # Best-first emotion order per face, computed for all faces at once
+    order = np.argsort(-results.scores, axis=1, kind="stable")
+    for i, ((x, y, w, h), scores) in enumerate(zip(results.boxes.tolist(), results.scores)):
+        top_emotion = EMOTION_LABELS[order[i, 0]]
 
         # Face bounding box
         color = emotion_colors.get(top_emotion, (255, 255, 255))
         cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
 
         # Label
-        label = f"{top_emotion.upper()}: {emotions[top_emotion]*100:.1f}%"
+        label = f"{top_emotion.upper()}: {scores[order[i, 0]]*100:.1f}%"
         cv2.putText(frame, label, (x, y - 10),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
 
@@ -56,7 +43,7 @@ def draw_emotion_data(frame, emotions_data):
         bar_height = 15
         spacing = 5
 
-        sorted_emotions = sorted(emotions.items(), key=lambda item: item[1], reverse=True)
+        sorted_emotions = [(EMOTION_LABELS[k], float(scores[k])) for k in order[i]]
         for j, (emotion, score) in enumerate(sorted_emotions):
             bar_length = int(score * bar_width)
             bar_color = emotion_colors.get(emotion, (255, 255, 255))
@@ -78,43 +65,61 @@ def draw_emotion_data(frame, emotions_data):
 
     return frame
 
-# ---------------- Main YOLO + Emotion --------------------
-
-# Load YOLOv5 model
-model = torch.hub.load('ultralytics/yolov5', 'custom', path='runs/train/live_detector/weights/best.pt')
-model.conf = 0.3
-model.iou = 0.7
+# ---------------- Main YOLO Emotion --------------------
 
 # Argument parser
-parser = argparse.ArgumentParser(description="YOLOv5 + Emotion Display")
+parser = argparse.ArgumentParser(description="YOLOv5 Emotion Display")
 parser.add_argument("-f", "--file", type=str, help="Path to input video file")
 parser.add_argument("-o", "--out", type=str, help="Output video file name (optional)")
+parser.add_argument("--no-record", action="store_true", help="Do not write an output video")
+parser.add_argument("--codec", type=str, default="XVID", help="FOURCC of the output video")
+parser.add_argument("--record-fps", type=float, default=0,
+                    help="Output video fps (default: the source's fps)")
+parser.add_argument("--record-size", type=str, default=None,
+                    help="Output resolution WIDTHxHEIGHT (default: the source's)")
+parser.add_argument("-s", "--source", type=str, default="0",
+                    help="Webcam index, image folder or 'synthetic[:WxH]' (ignored with --file)")
+parser.add_argument("--fast", action="store_true",
+                    help="Process recorded input as fast as possible instead of in real time")
+parser.add_argument("--headless", action="store_true", help="Do not open a preview window")
+parser.add_argument("--weights", type=str, default=DEFAULT_WEIGHTS, help="Trained YOLOv5 weights (.pt)")
+parser.add_argument("--format", choices=list(FORMATS), default="pt",
+                    help="Run the .pt weights or their TorchScript/ONNX export (see yolo_model.py)")
+parser.add_argument("--threads", type=int, default=0, help="CPU inference threads (0 = library default)")
 args = parser.parse_args()
 
+# Load YOLOv5 model from local weights (no torch.hub / network access).
+# It was trained on the 7 emotion classes, so one pass gives boxes and emotions.
+try:
+    detector = YOLOEmotionDetector(args.weights, args.format, args.threads, conf=0.3, iou=0.7)
+except FileNotFoundError as e:
+    print(f"[ERROR] {e}")
+    exit(1)
+
 # Choose source
-if args.file:
-    vs = cv2.VideoCapture(args.file)
-    if not vs.isOpened():
-        print(f"[ERROR] Cannot open video file: {args.file}")
-        exit(1)
-else:
-    vs = cv2.VideoCapture(0)
-    if not vs.isOpened():
-        print("[ERROR] Cannot access webcam.")
-        exit(1)
+try:
+    vs = open_source(args.file if args.file else args.source, realtime=not args.fast)
+except IOError as e:
+    print(f"[ERROR] {e}")
+    exit(1)
 
 # Warm up
-time.sleep(2.0)
-width = int(vs.get(cv2.CAP_PROP_FRAME_WIDTH))
-height = int(vs.get(cv2.CAP_PROP_FRAME_HEIGHT))
+if vs.kind == "webcam":
+    time.sleep(2.0)
+width = vs.width
+height = vs.height
 
 # Output file name
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 out_filename = args.out if args.out else f"output_{timestamp}.avi"
 
-# Set up writer
-fourcc = cv2.VideoWriter_fourcc(*"XVID")
-out = cv2.VideoWriter(out_filename, fourcc, 20.0, (width, height))
+# Set up writer; encoding runs on a background thread so it never stalls capture
+out = None
+if not args.no_record:
+    record_size = tuple(int(v) for v in args.record_size.lower().split("x")) if args.record_size else (width, height)
+    out = AsyncVideoWriter(out_filename, fps=args.record_fps or vs.fps, size=record_size,
+                           codec=args.codec, block=not vs.realtime)
+    print(f"[INFO] Recording to {out_filename} ({args.codec}, {out.fps:g} fps, {record_size[0]}x{record_size[1]})")
 
 print("[INFO] Press 'q' to quit.")
 
@@ -125,22 +130,9 @@ while True:
     if not ret:
         break
 
-    # YOLO detection
-    results = model(frame)
-    detections = results.xyxy[0]
-    names = model.names
-
-    for *box, conf, cls in detections:
-        x1, y1, x2, y2 = map(int, box)
-        label = names[int(cls)].upper()
-        conf_text = f"{label}: {int(conf * 100)}%"
-        cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
-        cv2.putText(frame, conf_text, (x1, y1 - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-    # Emotion detection + visualization
-    emotion_data = detect_emotions(frame)
-    frame = draw_emotion_data(frame, emotion_data)
+    # Single YOLO pass: face boxes with per-box emotion scores
+    results = detector.detect(frame)
+    frame = draw_emotion_data(frame, results)
 
     # FPS overlay
     current_time = time.time()
@@ -149,13 +141,16 @@ while True:
     cv2.putText(frame, f"FPS: {fps:.2f}", (10, 30),
                 cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
 
-    # Show frame
-    # out.write(frame)
-    cv2.imshow("YOLO + Emotion", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+    # Record and show frame
+    if out is not None:
+        out.write(frame)
+    if not args.headless:
+        cv2.imshow("YOLO + Emotion", frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
 
 # Cleanup
 vs.release()
-out.release()
+if out is not None:
+    out.release()
 cv2.destroyAllWindows()
\ No newline at end of file
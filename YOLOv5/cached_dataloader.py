@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+from yolov5.utils import dataloaders
+
+from dataset_cache import load_index
+
+# Memory maps opened by this process (each DataLoader worker opens its own)
+_open_images = {}
+
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class CachedImagesAndLabels(dataloaders.LoadImagesAndLabels):
+    """YOLOv5 dataset that reads pre-resized pixels from dataset_cache.py's memory maps.
+
+    Images missing from the cache, or cached at another size, are loaded
+    from disk as usual.  Labels still come from YOLOv5's own label cache.
+    """
+
+    cache_dir = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_slots = {}
+        for split in sorted(os.listdir(self.cache_dir)) if self.cache_dir else []:
+            split_dir = os.path.join(self.cache_dir, split)
+            index = load_index(split_dir)
+            if not index or index["img_size"] != self.img_size:
+                continue
+            images_path = os.path.join(split_dir, "images.npy")
+            for slot, (path, shape) in enumerate(zip(index["files"], index["shapes"])):
+                if shape is not None:
+                    self.cache_slots[_key(path)] = (images_path, slot, shape)
+        hits = sum(_key(path) in self.cache_slots for path in self.im_files)
+        print(f"[CACHE] {hits}/{len(self.im_files)} images served from {self.cache_dir}")
+
+    def load_image(self, i):
+        entry = self.cache_slots.get(_key(self.im_files[i]))
+        if entry is None:
+            return super().load_image(i)
+        images_path, slot, (h0, w0, h, w) = entry
+        images = _open_images.get(images_path)
+        if images is None:
+            images = _open_images[images_path] = np.load(images_path, mmap_mode="r")
+        # Copy out of the read-only map; augmentation works in place
+        return np.array(images[slot, :h, :w]), (h0, w0), (h, w)
+
+
+def install(cache_dir):
+    """Make yolov5's create_dataloader build CachedImagesAndLabels datasets."""
+    CachedImagesAndLabels.cache_dir = cache_dir
+    dataloaders.LoadImagesAndLabels = CachedImagesAndLabels
@@ -0,0 +1,139 @@
+"""dataset_cache.py
+--------------------------------
+One-off preparation of the training set for train_live_detector.py.
+
+Every split under ``dataset/`` is decoded once, resized so its long side
+matches the training image size (as YOLOv5's loader does), and stored in a
+single memory-mapped ``images.npy`` per split.  The YOLO label files go into
+a label index (``labels.npy`` rows plus per-image offsets).  Training then
+reads pixels straight from the page cache instead of re-decoding JPEGs every
+epoch.  Splits whose files are unchanged are not rebuilt.
+
+```bash
+python dataset_cache.py --img 640 --workers 8
+python train_live_detector.py --cache-dir dataset_cache --workers 8
+```
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SPLITS = ("train", "valid", "test")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def label_path(image_path):
+    """YOLO convention: dataset/<split>/images/x.jpg -> dataset/<split>/labels/x.txt"""
+    images_dir, name = os.path.split(image_path)
+    labels_dir = os.path.join(os.path.dirname(images_dir), "labels")
+    return os.path.join(labels_dir, os.path.splitext(name)[0] + ".txt")
+
+
+def read_labels(path):
+    if not os.path.exists(path):
+        return np.zeros((0, 5), dtype=np.float32)
+    labels = np.loadtxt(path, dtype=np.float32, ndmin=2)
+    return labels[:, :5] if labels.size else np.zeros((0, 5), dtype=np.float32)
+
+
+def resize_long_side(img, size):
+    height, width = img.shape[:2]
+    ratio = size / max(height, width)
+    if ratio == 1:
+        return img
+    interp = cv2.INTER_LINEAR if ratio > 1 else cv2.INTER_AREA
+    return cv2.resize(img, (round(width * ratio), round(height * ratio)), interpolation=interp)
+
+
+def _fill_slot(task):
+    images_path, slot, path, size = task
+    img = cv2.imread(path)
+    if img is None:
+        return slot, None
+    resized = resize_long_side(img, size)
+    images = np.load(images_path, mmap_mode="r+")
+    images[slot, :resized.shape[0], :resized.shape[1]] = resized
+    images.flush()
+    return slot, (*img.shape[:2], *resized.shape[:2])
+
+
+def load_index(split_dir):
+    index_path = os.path.join(split_dir, "index.json")
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, "r") as f:
+        return json.load(f)
+
+
+def build_split(image_dir, out_dir, size=640, workers=1, force=False):
+    """Cache one split; returns its index dict."""
+    files = sorted(os.path.join(image_dir, name) for name in os.listdir(image_dir)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    mtimes = [os.path.getmtime(path) for path in files]
+    index = load_index(out_dir)
+    if (not force and index and index["img_size"] == size
+            and index["files"] == files and index["mtimes"] == mtimes):
+        print(f"[CACHE] {out_dir} is up to date ({len(files)} images)")
+        return index
+
+    os.makedirs(out_dir, exist_ok=True)
+    index_path = os.path.join(out_dir, "index.json")
+    if os.path.exists(index_path):
+        os.remove(index_path)  # The index is written last and marks a complete cache
+    images_path = os.path.join(out_dir, "images.npy")
+    images = np.lib.format.open_memmap(images_path, mode="w+", dtype=np.uint8,
+                                       shape=(len(files), size, size, 3))
+    del images
+
+    shapes = [None] * len(files)
+    tasks = [(images_path, slot, path, size) for slot, path in enumerate(files)]
+    with multiprocessing.get_context("spawn").Pool(max(1, workers)) as pool:
+        for slot, shape in tqdm(pool.imap_unordered(_fill_slot, tasks, chunksize=16),
+                                total=len(tasks), unit="img", desc=os.path.basename(out_dir)):
+            shapes[slot] = shape
+
+    labels = [read_labels(label_path(path)) for path in files]
+    offsets = np.cumsum([0] + [len(rows) for rows in labels]).astype(np.int64)
+    np.save(os.path.join(out_dir, "labels.npy"),
+            np.concatenate(labels) if labels else np.zeros((0, 5), dtype=np.float32))
+    np.save(os.path.join(out_dir, "label_offsets.npy"), offsets)
+
+    unreadable = [files[slot] for slot, shape in enumerate(shapes) if shape is None]
+    for path in unreadable:
+        print(f"[CACHE] Could not read {path}; the trainer will fall back to it on disk")
+    index = {"img_size": size, "files": files, "mtimes": mtimes, "shapes": shapes}
+    with open(index_path, "w") as f:
+        json.dump(index, f)
+
+    classes = np.bincount(np.concatenate(labels)[:, 0].astype(int)) if offsets[-1] else []
+    print(f"[CACHE] {out_dir}: {len(files)} images, {int(offsets[-1])} boxes, "
+          f"per class {list(map(int, classes))}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-resize the training set into a memory-mapped cache")
+    parser.add_argument("--dataset", type=str, default=os.path.join(ROOT, "dataset"))
+    parser.add_argument("--out", type=str, default=os.path.join(ROOT, "dataset_cache"))
+    parser.add_argument("--img", type=int, default=640, help="Training image size")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if up to date")
+    args = parser.parse_args()
+
+    for split in SPLITS:
+        image_dir = os.path.join(args.dataset, split, "images")
+        if not os.path.isdir(image_dir):
+            print(f"[CACHE] No {image_dir}, skipping")
+            continue
+        build_split(image_dir, os.path.join(args.out, split), args.img, args.workers, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import argparse
 import os
 import warnings
 
@@ -15,9 +16,11 @@ train_path = os.path.join(root, "dataset/train/images").replace("\\", "/")
 val_path = os.path.join(root, "dataset/valid/images").replace("\\", "/")
 test_path = os.path.join(root, "dataset/test/images").replace("\\", "/")
 
-# Write the data.yaml file dynamically
-with open(yaml_path, "w") as f:
-    f.write(f"""train: {train_path}
+
+def write_data_yaml():
+    """Write data.yaml with absolute paths for this checkout."""
+    with open(yaml_path, "w") as f:
+        f.write(f"""train: {train_path}
 val: {val_path}
 test: {test_path}
 
@@ -26,16 +29,33 @@ names: ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']
 """)
 
 
-# Import YOLOv5 training API
-import yolov5.train as train
-
 # Entry point (needed for multiprocessing on Windows)
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the YOLOv5 live emotion detector")
+    parser.add_argument("--img", type=int, default=640, help="Image size")
+    parser.add_argument("--batch", type=int, default=16, help="Batch size")
+    parser.add_argument("--epochs", type=int, default=50, help="Number of epochs")
+    parser.add_argument("--weights", type=str, default="yolov5s.pt", help="Base weights")
+    parser.add_argument("--workers", type=int, default=8, help="Data loader worker processes")
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Read images from a dataset_cache.py cache instead of decoding JPEGs")
+    args = parser.parse_args()
+
+    write_data_yaml()
+
+    # Import YOLOv5 training API
+    import yolov5.train as train
+
+    if args.cache_dir:
+        from cached_dataloader import install
+        install(os.path.abspath(args.cache_dir))
+
     train.run(
-        img=640,                     # Image size
-        batch=16,                    # Batch size
-        epochs=50,                   # Number of epochs
+        img=args.img,                # Image size
+        batch=args.batch,            # Batch size
+        epochs=args.epochs,          # Number of epochs
         data='data.yaml',            # Path to data config
-        weights='yolov5s.pt',        # Base weights
+        weights=args.weights,        # Base weights
+        workers=args.workers,        # Data loader workers
         name='live_detector'         # Experiment name
     )
@@ -0,0 +1,213 @@
+"""yolo_model.py
+--------------------------------
+Offline loading, export and single-pass inference of the trained
+live_detector weights.
+
+torch.hub.load('ultralytics/yolov5', ...) resolves the hub repo over the
+network on every launch.  This module loads the weights through the
+installed ``yolov5`` package instead (the same one train_live_detector.py
+trains with), so nothing is downloaded.  The weights can be exported once to
+TorchScript and ONNX and run through the same code path.
+
+The detector was trained on the seven emotion classes of data.yaml, so one
+forward pass gives both the face boxes and their emotions.
+YOLOEmotionDetector returns them as a FaceResults, or in the FER
+``detect_emotions`` schema for the shared backend interface.
+
+```bash
+python yolo_model.py --export                      # best.torchscript + best.onnx
+python yolo_model.py --bench --threads 4 --frames 200
+```
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from face_results import FaceResults
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Copies of this module outside YOLOv5/ find the weights in the sibling directory
+WEIGHTS_CANDIDATES = [
+    os.path.join(ROOT, "runs", "train", "live_detector", "weights", "best.pt"),
+    os.path.join(ROOT, "..", "YOLOv5", "runs", "train", "live_detector", "weights", "best.pt"),
+]
+DEFAULT_WEIGHTS = next((p for p in WEIGHTS_CANDIDATES if os.path.exists(p)), WEIGHTS_CANDIDATES[0])
+FORMATS = {"pt": ".pt", "torchscript": ".torchscript", "onnx": ".onnx"}
+IMG_SIZE = 640
+
+
+def resolve_weights(weights=None, fmt="pt"):
+    """Path of the weights in the requested format, next to the .pt file."""
+    weights = weights or DEFAULT_WEIGHTS
+    path = os.path.splitext(weights)[0] + FORMATS[fmt]
+    if not os.path.exists(path):
+        hint = "" if fmt == "pt" else " - run 'python yolo_model.py --export' first"
+        raise FileNotFoundError(f"No {fmt} weights at {path}{hint}")
+    return path
+
+
+def set_threads(threads):
+    if threads:
+        import torch
+
+        torch.set_num_threads(threads)
+        cv2.setNumThreads(threads)
+
+
+def load_model(weights=None, fmt="pt", threads=0):
+    """Load the raw network without network access; returns (model, load_seconds).
+
+    .pt weights have Conv+BatchNorm layers fused on load; exported
+    TorchScript/ONNX files are fused at export time.
+    """
+    start = time.perf_counter()
+    set_threads(threads)
+    import torch
+    from yolov5.models.common import DetectMultiBackend
+
+    path = resolve_weights(weights, fmt)
+    model = DetectMultiBackend(path, device=torch.device("cpu"), fuse=True)
+    if fmt == "onnx" and threads:
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        model.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+    elapsed = time.perf_counter() - start
+    print(f"[YOLO] Loaded {os.path.basename(path)} ({fmt}) in {elapsed:.2f}s")
+    return model, elapsed
+
+
+def letterbox(img, size=IMG_SIZE):
+    """Resize keeping aspect ratio and pad to size x size; returns (img, scale, (pad_x, pad_y))."""
+    height, width = img.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = round(width * scale), round(height * scale)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(img, (new_w, new_h))
+    return canvas, scale, (pad_x, pad_y)
+
+
+class YOLOEmotionDetector:
+    """Face boxes and emotion scores from one YOLOv5 pass, in FER's result schema.
+
+    Unlike FER, find_faces() already runs the whole model; its result is kept
+    so the following detect_emotions() on the same frame object costs nothing.
+    Boxes passed as face_rectangles are not re-classified: YOLO only scores
+    the boxes it proposes itself.
+    """
+
+    def __init__(self, weights=None, fmt="pt", threads=0, conf=0.3, iou=0.7):
+        self.model, self.load_time = load_model(weights, fmt, threads)
+        self.conf = conf
+        self.iou = iou
+        names = self.model.names
+        # Model classes in data.yaml order; FaceResults.from_yolo reorders them
+        self.names = [names[i] for i in sorted(names)] if isinstance(names, dict) else list(names)
+        self._pending = {}
+
+    def detect(self, img, bgr=True):
+        """One pass over img; returns a FaceResults in source-frame coordinates."""
+        import torch
+
+        padded, scale, (pad_x, pad_y) = letterbox(img)
+        if bgr:
+            padded = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB)
+        tensor = torch.from_numpy(padded.transpose(2, 0, 1).copy()).float().div_(255.0)[None]
+        with torch.no_grad():
+            pred = self.model(tensor)
+        if isinstance(pred, (list, tuple)):
+            pred = pred[0]
+        pred = pred[0].cpu().numpy() if hasattr(pred, "cpu") else np.asarray(pred)[0]
+
+        class_probs = pred[:, 5:]
+        confidence = pred[:, 4] * class_probs.max(axis=1)
+        candidates = np.flatnonzero(confidence >= self.conf)
+        if candidates.size == 0:
+            return FaceResults()
+
+        # xywh centre -> top-left xywh in letterboxed pixels
+        boxes = pred[candidates, :4].copy()
+        boxes[:, :2] -= boxes[:, 2:] / 2
+        keep = cv2.dnn.NMSBoxes(boxes.tolist(), confidence[candidates].tolist(), self.conf, self.iou)
+
+        keep = np.asarray(keep, dtype=int).reshape(-1)
+        height, width = img.shape[:2]
+        # Letterboxed top-left xywh -> source-frame x1, y1, x2, y2 for all kept boxes at once
+        xyxy = np.concatenate([boxes[keep, :2], boxes[keep, :2] + boxes[keep, 2:]], axis=1)
+        xyxy = (xyxy - [pad_x, pad_y, pad_x, pad_y]) / scale
+        xyxy = np.clip(xyxy, 0, [width, height, width, height])
+        return FaceResults.from_yolo(xyxy, class_probs[candidates[keep]], self.names)
+
+    def find_faces(self, img, bgr=True):
+        results = self.detect(img, bgr=bgr)
+        if len(self._pending) >= 16:
+            self._pending.clear()
+        # Keep the frame itself so its id() cannot be reused while pending
+        self._pending[id(img)] = (img, results)
+        return [tuple(box) for box in results.boxes.tolist()]
+
+    def detect_emotions(self, img, face_rectangles=None):
+        pending_img, results = self._pending.pop(id(img), (None, None))
+        if pending_img is not img:
+            results = self.detect(img)
+        return results.to_fer()
+
+
+def export_model(weights=None, formats=("torchscript", "onnx"), imgsz=IMG_SIZE):
+    """Export the .pt weights next to themselves; returns the written paths."""
+    from yolov5.export import run as export_run
+
+    weights = resolve_weights(weights, "pt")
+    export_run(weights=weights, include=tuple(formats), imgsz=(imgsz, imgsz), device="cpu")
+    return [os.path.splitext(weights)[0] + FORMATS[fmt] for fmt in formats]
+
+
+def benchmark(weights=None, formats=FORMATS, threads=0, frames=100, width=1280, height=720):
+    """Startup time and per-frame latency of every available format."""
+    from frame_sources import SyntheticSource
+
+    source = SyntheticSource(width=width, height=height, count=frames + 5, realtime=False)
+    inputs = list(source)
+    rows = []
+    for fmt in formats:
+        try:
+            detector = YOLOEmotionDetector(weights, fmt, threads)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"[YOLO] Skipping {fmt}: {e}")
+            continue
+        for frame in inputs[:5]:
+            detector.detect(frame)
+        latencies = []
+        for frame in inputs[5:]:
+            start = time.perf_counter()
+            detector.detect(frame)
+            latencies.append(time.perf_counter() - start)
+        latencies = np.array(latencies) * 1000
+        rows.append((fmt, detector.load_time, latencies.mean(), np.percentile(latencies, 95)))
+
+    print(f"\n{'format':<12} {'startup s':>10} {'mean ms':>9} {'p95 ms':>8} {'fps':>7}")
+    for fmt, load_s, mean_ms, p95_ms in rows:
+        print(f"{fmt:<12} {load_s:>10.2f} {mean_ms:>9.1f} {p95_ms:>8.1f} {1000 / mean_ms:>7.1f}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export and benchmark the live_detector weights")
+    parser.add_argument("--weights", type=str, default=DEFAULT_WEIGHTS, help="Trained .pt weights")
+    parser.add_argument("--export", action="store_true", help="Write TorchScript and ONNX exports")
+    parser.add_argument("--bench", action="store_true", help="Compare startup and per-frame latency")
+    parser.add_argument("--threads", type=int, default=0, help="CPU inference threads (0 = library default)")
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.export:
+        for path in export_model(args.weights):
+            print(f"[YOLO] Exported {path}")
+    if args.bench or not args.export:
+        benchmark(args.weights, threads=args.threads, frames=args.frames)